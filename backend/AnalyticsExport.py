@@ -0,0 +1,225 @@
+import csv
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from DefenseServer import GameState, NavalBattleFSM
+
+SHOT_COLUMNS = [
+    "game_id", "shot", "cell", "result_code", "state_before", "state_after", "elapsed_us", "timestamp"
+]
+GAME_COLUMNS = [
+    "game_id", "shots", "hits", "misses", "accuracy", "sunk_ships", "final_state",
+    "created_at", "finished_at", "duration_s", "outcome"
+]
+FORMATS = ("csv", "parquet", "arrow")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow export needs pyarrow: pip install pyarrow (or use format='csv')")
+
+
+class _TableWriter:
+    """Appends column batches to one file"""
+
+    def __init__(self, path: str, columns: List[str], fmt: str):
+        self.path = path
+        self.columns = columns
+        self.fmt = fmt
+        self.writer = None
+        self.file = None
+
+    def write(self, batch: Dict[str, list]):
+        if self.fmt == "csv":
+            self._write_csv(batch)
+        else:
+            self._write_arrow(batch)
+
+    def _write_csv(self, batch: Dict[str, list]):
+        if self.file is None:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            if not new_file and not self._same_header():
+                # Written with other columns: keep it aside instead of appending misaligned rows
+                root, extension = os.path.splitext(self.path)
+                os.replace(self.path, f"{root}-{time.strftime('%Y%m%d-%H%M%S')}{extension}")
+                new_file = True
+            self.file = open(self.path, "a", newline="", encoding="utf-8")
+            self.writer = csv.writer(self.file)
+            if new_file:
+                self.writer.writerow(self.columns)
+        self.writer.writerows(zip(*(batch[c] for c in self.columns)))
+        self.file.flush()
+
+    def _same_header(self) -> bool:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None) == self.columns
+
+    def _write_arrow(self, batch: Dict[str, list]):
+        pa = _require_pyarrow()
+        table = pa.table({c: batch[c] for c in self.columns})
+        if self.writer is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                import pyarrow.ipc as ipc
+                self.writer = ipc.new_file(self.path, table.schema)
+        # One row group / record batch per flushed batch
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.fmt == "csv":
+            if self.file is not None:
+                self.file.close()
+        elif self.writer is not None:
+            self.writer.close()
+        self.writer = None
+        self.file = None
+
+
+class GameExporter:
+    """Streams per-shot and per-game records to columnar files
+
+    Records are buffered column by column and handed to a writer thread in
+    batches of batch_size rows. At most max_pending batches wait for the
+    writer; beyond that a full batch is dropped and counted in dropped_rows
+    instead of blocking the caller (the API event loop), so memory stays
+    bounded. close() waits for every batch.
+
+    Attach it to a game with fsm.listeners.append(exporter.record_shot).
+    """
+
+    def __init__(self, directory: str, fmt: str = "csv", batch_size: int = 10000, max_pending: int = 8):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}', use one of {FORMATS}")
+        if fmt != "csv":
+            _require_pyarrow()
+
+        os.makedirs(directory, exist_ok=True)
+        extension = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}[fmt]
+        # Arrow/Parquet files cannot be appended to, give each exporter its own
+        suffix = "" if fmt == "csv" else f"-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.writers = {
+            "shots": _TableWriter(os.path.join(directory, f"shots{suffix}.{extension}"), SHOT_COLUMNS, fmt),
+            "games": _TableWriter(os.path.join(directory, f"games{suffix}.{extension}"), GAME_COLUMNS, fmt),
+        }
+        self.batch_size = batch_size
+        self.buffers = {"shots": self._empty(SHOT_COLUMNS), "games": self._empty(GAME_COLUMNS)}
+        self.lock = threading.Lock()
+        self.pending: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self.dropped_batches = 0
+        self.dropped_rows = 0
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+        self.closed = False
+
+    @staticmethod
+    def _empty(columns: List[str]) -> Dict[str, list]:
+        return {c: [] for c in columns}
+
+    def record_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener: one row per attack, one game row when the fleet is destroyed"""
+        try:
+            result_code = int(result.split("-", 1)[0])
+        except ValueError:
+            result_code = 0
+        with self.lock:
+            buffer = self.buffers["shots"]
+            buffer["game_id"].append(fsm.game_id)
+            buffer["shot"].append(len(fsm.all_attacks))
+            buffer["cell"].append(position)
+            buffer["result_code"].append(result_code)
+            buffer["state_before"].append(previous_state.value)
+            buffer["state_after"].append(fsm.current_state.value)
+            buffer["elapsed_us"].append(elapsed_ns / 1000)
+            buffer["timestamp"].append(time.time())
+            batch = self._take("shots")
+        self._enqueue("shots", batch)
+
+        if result == "500-sunken":
+            self.record_game(fsm)
+
+    def record_game(self, fsm: NavalBattleFSM, outcome: str = "defeated"):
+        """Write the summary row of a game
+
+        Called automatically on defeat; call it with outcome "terminated" or
+        "evicted" when a game ends from outside, so every game gets a row.
+        """
+        hits = sum(len(ship.hits) for ship in fsm.ships)
+        shots = len(fsm.all_attacks)
+        finished_at = (fsm.last_attack_at if outcome == "defeated" else None) or time.time()
+        with self.lock:
+            buffer = self.buffers["games"]
+            buffer["game_id"].append(fsm.game_id)
+            buffer["shots"].append(shots)
+            buffer["hits"].append(hits)
+            buffer["misses"].append(shots - hits)
+            buffer["accuracy"].append(hits / shots * 100 if shots else 0.0)
+            buffer["sunk_ships"].append(sum(1 for ship in fsm.ships if ship.is_sunk))
+            buffer["final_state"].append(fsm.current_state.value)
+            buffer["created_at"].append(fsm.created_at)
+            buffer["finished_at"].append(finished_at)
+            buffer["duration_s"].append(finished_at - fsm.created_at)
+            buffer["outcome"].append(outcome)
+            batch = self._take("games")
+        self._enqueue("games", batch)
+
+    def _take(self, table: str, force: bool = False) -> Optional[Dict[str, list]]:
+        # Called with self.lock held
+        buffer = self.buffers[table]
+        rows = len(buffer["game_id"])
+        if rows and (force or rows >= self.batch_size):
+            self.buffers[table] = self._empty(list(buffer))
+            return buffer
+        return None
+
+    def _enqueue(self, table: str, batch: Optional[Dict[str, list]], wait: bool = False):
+        # Called without self.lock, so a full queue never holds up the other recorders
+        if batch is None:
+            return
+        if wait:
+            self.pending.put((table, batch))
+            return
+        try:
+            self.pending.put_nowait((table, batch))
+        except queue.Full:
+            rows = len(batch["game_id"])
+            with self.lock:
+                self.dropped_batches += 1
+                self.dropped_rows += rows
+            print(f"⚠️ Exportación saturada: {rows} filas de {table} descartadas")
+
+    def flush(self, wait: bool = False):
+        """Hand every buffered row to the writer, waiting for room in the queue if wait"""
+        with self.lock:
+            batches = [(table, self._take(table, force=True)) for table in ("shots", "games")]
+        for table, batch in batches:
+            self._enqueue(table, batch, wait)
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            table, batch = item
+            try:
+                self.writers[table].write(batch)
+            except Exception as e:
+                print(f"❌ Error exportando {table}: {e}")
+
+    def close(self):
+        """Flush, wait for the writer and close the files"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush(wait=True)
+        self.pending.put(None)
+        self.thread.join()
+        for writer in self.writers.values():
+            writer.close()
@@ -1,7 +1,29 @@
+import argparse
+import json
+import random
 import socket
 import sys
-import requests
-from typing import Dict, Set
+from collections import deque
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# How each server response code is shown to the player
+RESULT_DISPLAY = {
+    "404-failed": ("💧", "Agua"),
+    "202-shocked": ("💥", "¡Impacto!"),
+    "200-sunken": ("🔥", "¡Barco hundido!"),
+    "500-sunken": ("🎆", "¡Último barco hundido!")
+}
+
+BOARD_ROWS = 'ABCDE'
+BOARD_COLS = '12345'
+
+class AttackMode(Enum):
+    """Strategy states of the attacker"""
+
+    HUNT = "hunt"      # parity search for a new ship
+    TARGET = "target"  # finishing a ship that was hit
+    DONE = "done"      # every ship sunk
 
 class AttackBoard:
     """Visual representation of attack results"""
@@ -19,14 +41,12 @@ class AttackBoard:
     def update_attack(self, position: str, result: str):
         """Update board with attack result"""
         self.attacks.add(position)
-        print(self.grid[position], position)
         if "404-failed" in result:
             self.grid[position] = 'O' #miss
         elif "202-shocked" in result:
             self.grid[position] = 'X' #hit
         elif "200-sunken" in result or "500-sunken" in result:
             self.grid[position] = '#' #sunk
-        print(self.grid)
 
     def display(self):
         """Display the attack board"""
@@ -46,24 +66,132 @@ class AttackBoard:
         print("  └─────────┘")
         print("Legend: ~ = Not attacked, O= Miss, X= Hit, #=Sunk")
 
+class AttackConnection:
+    """Long-lived TCP connection to a DefenseServer
+
+    Shots are newline-terminated "GAME_ID:POSITION" messages. Several shots can
+    be written before reading any response (pipelining); the server answers in
+    order, so responses are matched to the pending shots first-in first-out.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket: Optional[socket.socket] = None
+        self.pending = deque()  # positions waiting for a response
+        self.buffer = ""
+
+    def connect(self):
+        """Open the connection (once)"""
+        if self.socket is None:
+            self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self
+
+    def submit(self, positions: List[str], game_id: str):
+        """Write one or more shots without waiting for their results"""
+        self.connect()
+        message = "".join(f"{game_id}:{position}\n" for position in positions)
+        self.socket.sendall(message.encode('utf-8'))
+        self.pending.extend(positions)
+
+    def collect(self) -> Tuple[str, str]:
+        """Read the next response. Returns (position, response)"""
+        while '\n' not in self.buffer:
+            chunk = self.socket.recv(4096)
+            if not chunk:
+                raise ConnectionError("Connection closed by server")
+            self.buffer += chunk.decode('utf-8')
+        line, self.buffer = self.buffer.split('\n', 1)
+        return self.pending.popleft(), line.strip()
+
+    def send(self, position: str, game_id: str) -> str:
+        """Send one shot and wait for its result"""
+        return self.send_salvo([position], game_id)[0][1]
+
+    def send_salvo(self, positions: List[str], game_id: str) -> List[Tuple[str, str]]:
+        """Pipeline several shots and return [(position, response), ...] in order"""
+        self.submit(positions, game_id)
+        return [self.collect() for _ in positions]
+
+    def close(self):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            finally:
+                self.socket = None
+                self.pending.clear()
+                self.buffer = ""
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
 class AttackClientFSM:
     """FSM for managinf attack states and strategy"""
 
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None):
         self.attack_board = AttackBoard()
         self.total_attacks = 0
         self.hits = 0
         self.misses = 0
         self.sunk_ships = 0
         self.game_won = False
+        self.version = 0  # bumped on every processed result
+        self.connection: Optional[AttackConnection] = None  # TCP transport, see open_tcp
+        self._session = None  # HTTP keep-alive session
+
+        # Hunt/target strategy, see next_move. Both queues are popped from the
+        # end and attacked cells are skipped when popped, so a move costs O(1)
+        # amortized and a result only touches its four neighbours
+        self.mode = AttackMode.HUNT
+        rng = rng or random.Random()
+        even = [f"{r}{c}" for i, r in enumerate(BOARD_ROWS) for j, c in enumerate(BOARD_COLS) if (i + j) % 2 == 0]
+        odd = [f"{r}{c}" for i, r in enumerate(BOARD_ROWS) for j, c in enumerate(BOARD_COLS) if (i + j) % 2 == 1]
+        rng.shuffle(even)
+        rng.shuffle(odd)
+        self.hunt_queue = odd + even  # checkerboard cells first
+        self.target_queue: List[str] = []
+
+    def _http_session(self):
+        """Reuse one HTTP connection for every request to the API"""
+        import requests  # lazy: the API server imports this module but never talks HTTP from it
+
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+
+    def open_tcp(self, host: str, port: int) -> bool:
+        """Use a persistent TCP connection to a DefenseServer instead of HTTP"""
+        try:
+            self.connection = AttackConnection(host, port).connect()
+            print(f"✅ Conexión TCP establecida con {host}:{port}")
+            return True
+        except OSError as e:
+            print(f"❌ No se pudo conectar a {host}:{port}: {e}")
+            self.connection = None
+            return False
+
+    def close(self):
+        """Close the open connections"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def connect_to_server(self, host: str, port: int) -> bool:
         """Test connection to enemy server"""
+        import requests
 
         try:
             # Test HTTP connection to the API
             test_url = f"http://{host}:{port}/api/health"
-            response = requests.get(test_url, timeout=5)
+            response = self._http_session().get(test_url, timeout=5)
 
             if response.status_code == 200:
                 print(f"✅ Conexión HTTP establecida. Respuesta: {response.json()}")
@@ -99,6 +227,14 @@ class AttackClientFSM:
     
     def send_attack(self, host: str, port: int, position: str, enemy_game_id: str) -> str:
         """Send attack to enemy server"""
+        if self.connection is not None:
+            try:
+                return self.connection.send(position, enemy_game_id)
+            except OSError as e:
+                self.connection.close()
+                return f"ERROR: {e}"
+
+        import requests
 
         try:
             url=f"http://{host}:{port}/api/defense/attack"
@@ -109,7 +245,7 @@ class AttackClientFSM:
             print(f"[DEBUG] Payload: {payload}")
             print(f"[DEBUG] Params: {params}")
 
-            response = requests.post(url, json=payload, params=params, timeout=10)
+            response = self._http_session().post(url, json=payload, params=params, timeout=10)
 
             print(f"[DEBUG] Código de respuesta: {response.status_code}")
             print(f"[DEBUG] Respuesta: {response.text}")
@@ -152,10 +288,21 @@ class AttackClientFSM:
         except Exception as e:
             return f"ERROR: {e}"""
         
+    def send_salvo(self, host: str, port: int, positions: List[str], enemy_game_id: str) -> List[Tuple[str, str]]:
+        """Send several shots, pipelined over TCP when connected. Returns [(position, response), ...]"""
+        if self.connection is not None:
+            try:
+                return self.connection.send_salvo(positions, enemy_game_id)
+            except OSError as e:
+                self.connection.close()
+                return [(position, f"ERROR: {e}") for position in positions]
+        return [(position, self.send_attack(host, port, position, enemy_game_id)) for position in positions]
+
     def process_attack_result(self, position: str, response: str):
         """process and update attact result"""
 
         self.total_attacks += 1
+        self.version += 1
 
         #update board
         self.attack_board.update_attack(position, response)
@@ -174,6 +321,68 @@ class AttackClientFSM:
             self.sunk_ships += 1
             self.game_won = True
 
+        self._update_mode(position, response)
+
+    def _update_mode(self, position: str, response: str):
+        """Move between HUNT and TARGET after a result"""
+        if "202-shocked" in response:
+            self.mode = AttackMode.TARGET
+            self.queue_neighbours(position)
+        elif "500-sunken" in response:
+            self.mode = AttackMode.DONE
+            self.target_queue.clear()
+        elif "200-sunken" in response:
+            # The ship is finished, back to the parity search
+            self.mode = AttackMode.HUNT
+            self.target_queue.clear()
+
+    def queue_neighbours(self, position: str):
+        """Add the unattacked neighbours of a hit to the target queue
+
+        Cells in line with an adjacent hit go on top, ships are straight.
+        """
+        row, col = BOARD_ROWS.index(position[0]), BOARD_COLS.index(position[1:])
+        grid = self.attack_board.grid
+        in_line = []
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            r, c = row + dr, col + dc
+            if not (0 <= r < len(BOARD_ROWS) and 0 <= c < len(BOARD_COLS)):
+                continue
+            cell = f"{BOARD_ROWS[r]}{BOARD_COLS[c]}"
+            if cell in self.attack_board.attacks:
+                continue
+            r, c = row - dr, col - dc
+            if 0 <= r < len(BOARD_ROWS) and 0 <= c < len(BOARD_COLS) and grid[f"{BOARD_ROWS[r]}{BOARD_COLS[c]}"] == 'X':
+                in_line.append(cell)
+            else:
+                self.target_queue.append(cell)
+        self.target_queue.extend(in_line)
+
+    def next_move(self) -> Optional[str]:
+        """Next cell to attack according to the current mode, None when there is nothing left"""
+        if self.mode is AttackMode.DONE:
+            return None
+        attacks = self.attack_board.attacks
+        while self.target_queue:
+            position = self.target_queue.pop()
+            if position not in attacks:
+                return position
+        if self.mode is not AttackMode.HUNT:
+            self.mode = AttackMode.HUNT
+            self.version += 1  # the mode is part of the status
+        while self.hunt_queue:
+            position = self.hunt_queue.pop()
+            if position not in attacks:
+                return position
+        return None
+
+    def push_back(self, position: str):
+        """Return a cell taken by next_move whose shot did not go through"""
+        if self.mode is AttackMode.TARGET:
+            self.target_queue.append(position)
+        else:
+            self.hunt_queue.append(position)
+
     def display_stats(self):
         """Display attack statistics"""
         print(f"\n📊 Estadísticas:")
@@ -206,8 +415,50 @@ class AttackClient:
         print("FSM de ataque iniciado")
 
         #Main attack loop
-        self._attack_loop()
+        try:
+            self._attack_loop()
+        finally:
+            self.fsm.close()
+
 
+    def connect(self, host: str, port: int, enemy_game_id: str = "default", transport: str = "http") -> bool:
+        """Setup the connection to the enemy without prompting"""
+        self.enemy_host = host
+        self.enemy_port = port
+        self.enemy_game_id = enemy_game_id
+        if transport == 'tcp':
+            return self.fsm.open_tcp(host, port)
+        return self.fsm.connect_to_server(host, port)
+
+    def run_headless(self, salvos: Iterable[List[str]], on_result: Callable[[str, str], None] = None) -> bool:
+        """Fire each salvo (list of positions) in order without prompting
+
+        Stops on victory or when the moves run out. Returns true if the game was won.
+        """
+        try:
+            for salvo in salvos:
+                # dict.fromkeys drops repeats within the salvo, a second shot at a cell would come back as a miss
+                positions = [p for p in dict.fromkeys(salvo) if self._is_valid_position(p) and p not in self.fsm.attack_board.attacks]
+                if not positions:
+                    continue
+
+                for position, response in self.fsm.send_salvo(self.enemy_host, self.enemy_port, positions, self.enemy_game_id):
+                    if response.startswith("ERROR"):
+                        print(f"❌ {position}: {response}")
+                        continue
+                    self.fsm.process_attack_result(position, response)
+                    print(f"📡 {position} -> {response}")
+                    if on_result:
+                        on_result(position, response)
+
+                if self.fsm.game_won:
+                    print(f"🎉 ¡VICTORIA! Juego completado en {self.fsm.total_attacks} ataques")
+                    break
+        finally:
+            self.fsm.close()
+
+        self.fsm.display_stats()
+        return self.fsm.game_won
 
     def _setup_connection(self) -> bool:
         """Setup conecction to enemy server"""
@@ -225,8 +476,15 @@ class AttackClient:
                 if not self.enemy_game_id:
                     self.enemy_game_id = "default"
 
+                transport = input("Protocolo: 'http' para la API o 'tcp' para un DefenseServer (por defecto http): ").strip().lower()
+
                 #test connectionn
-                if self.fsm.connect_to_server(self.enemy_host,self.enemy_port):
+                if transport == 'tcp':
+                    connected = self.fsm.open_tcp(self.enemy_host, self.enemy_port)
+                else:
+                    connected = self.fsm.connect_to_server(self.enemy_host, self.enemy_port)
+
+                if connected:
                     print(f"✅ Conectado a {self.enemy_host}:{self.enemy_port}")
                     print(f"🎯 Game ID enemigo: {self.enemy_game_id}")
                     return True
@@ -250,36 +508,40 @@ class AttackClient:
                 self.fsm.attack_board.display()
                 self.fsm.display_stats()
 
-                #Get attack position
-                position = input("\nIngrese coordenada de ataque (ej: B2) o 'q' para salir: ").strip().upper()
+                #Get attack positions (several separated by spaces for a salvo)
+                positions = input("\nIngrese coordenada(s) de ataque (ej: B2 o B2 B3 B4) o 'q' para salir: ").strip().upper().split()
 
-                if position.lower() == 'q':
+                if positions == ['Q']:
                     print("🛑 Saliendo del juego...")
                     break
 
-                #Validate position
-                if not self._is_valid_position(position):
+                #Validate positions
+                if not positions or not all(self._is_valid_position(position) for position in positions):
                     print("❌ Posición inválida. Use formato como A1, B2, etc.")
                     continue
 
                 #check if already attacked
-                if position in self.fsm.attack_board.attacks:
+                if any(position in self.fsm.attack_board.attacks for position in positions) or len(set(positions)) != len(positions):
                     print("❌ Ya atacaste esa posición. Intenta otra.")
                     continue
 
-                #send attack
+                #send attack(s)
                 print("🚀 Enviando ataque...")
-                response = self.fsm.send_attack(self.enemy_host, self.enemy_port, position, self.enemy_game_id)
+                if len(positions) == 1:
+                    results = [(positions[0], self.fsm.send_attack(self.enemy_host, self.enemy_port, positions[0], self.enemy_game_id))]
+                else:
+                    results = self.fsm.send_salvo(self.enemy_host, self.enemy_port, positions, self.enemy_game_id)
 
-                if response.startswith("ERROR"):
-                    print(f"❌ {response}")
-                    continue
+                for position, response in results:
+                    if response.startswith("ERROR"):
+                        print(f"❌ {response}")
+                        continue
 
-                #process result
-                self.fsm.process_attack_result(position, response)
+                    #process result
+                    self.fsm.process_attack_result(position, response)
 
-                #display result
-                self._display_attack_result(position, response)
+                    #display result
+                    self._display_attack_result(position, response)
 
                 #check for victory
                 if self.fsm.game_won:
@@ -304,18 +566,11 @@ class AttackClient:
     
     def _display_attack_result(self, position: str, response: str):
         """Display formatted attack result"""
-        result_messages = {
-            "404-fallido": f"💧 {response} (Agua)",
-            "202-impactado": f"💥 {response} (¡Impacto!)",
-            "200-hundido": f"🔥 {response} (¡Barco hundido!)",
-            "500-hundido": f"🎆 {response} (¡Último barco hundido!)"
-        }
-
         #find matching response type
         message = response
-        for key, formatted_msg in result_messages.items():
+        for key, (icon, text) in RESULT_DISPLAY.items():
             if key in response:
-                message = formatted_msg
+                message = f"{icon} {response} ({text})"
                 break
 
         print(f"📡 Respuesta: {message}")
@@ -332,11 +587,69 @@ class AttackClient:
 
         print(f"\n🎯 Juego completado en {self.fsm.total_attacks} ataques")
 
-def main():
+def read_move_script(path: str) -> List[List[str]]:
+    """One salvo per line ("B2" or "B2 B3 B4"), '#' starts a comment"""
+    salvos = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            positions = line.split('#', 1)[0].strip().upper().replace(',', ' ').split()
+            if positions:
+                salvos.append(positions)
+    return salvos
+
+def strategy_moves(strategy) -> Iterable[List[str]]:
+    """Single-shot salvos chosen by a targeting strategy until it runs out of cells"""
+    while True:
+        try:
+            yield [strategy.next_move()]
+        except IndexError:
+            return
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente de ataque. Sin argumentos funciona en modo interactivo")
+    parser.add_argument("--config", help="archivo JSON con host, port, game_id, transport, script/strategy")
+    parser.add_argument("--host", help="IP del enemigo")
+    parser.add_argument("--port", type=int, help="puerto del enemigo (por defecto 8000)")
+    parser.add_argument("--game-id", help="game_id del enemigo (por defecto 'default')")
+    parser.add_argument("--transport", choices=["http", "tcp"], help="API HTTP o DefenseServer TCP (por defecto http)")
+    parser.add_argument("--script", help="archivo de movimientos, una salva por línea")
+    parser.add_argument("--strategy", help="estrategia de Tournament.TARGETING (sequential, random, parity, ...)")
+    parser.add_argument("--seed", type=int, help="semilla de la estrategia")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function"""
     try:
+        args = parse_args(argv)
+        config = {}
+        if args.config:
+            with open(args.config, encoding='utf-8') as f:
+                config = json.load(f)
+
         client = AttackClient()
-        client.start()
+        host = args.host or config.get("host")
+        if not host:
+            client.start()
+            return
+
+        # Headless attacker
+        port = args.port or int(config.get("port", 8000))
+        game_id = args.game_id or config.get("game_id", "default")
+        transport = args.transport or config.get("transport", "http")
+        script = args.script or config.get("script")
+        strategy_name = args.strategy or config.get("strategy", "parity")
+        seed = args.seed if args.seed is not None else config.get("seed")
+
+        if not client.connect(host, port, game_id, transport):
+            sys.exit(2)
+
+        if script:
+            won = client.run_headless(read_move_script(script))
+        else:
+            from Tournament import TARGETING  # strategies live with the tournament runner
+            strategy = TARGETING[strategy_name](random.Random(seed))
+            won = client.run_headless(strategy_moves(strategy), strategy.record)
+        sys.exit(0 if won else 1)
 
     except KeyboardInterrupt:
         print("\n🛑 Programa interrumpido por el usuario")
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Callable, Dict, Optional, Set
+
+
+class Subscriber:
+    """One WebSocket viewer of a game
+
+    Only the latest payload is kept: if the client is slower than the updates,
+    intermediate states are coalesced instead of queued.
+    """
+
+    def __init__(self, websocket, send_timeout: float):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.pending: Optional[str] = None
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.dropped_updates = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, payload: str):
+        """Queue payload, replacing any update the client has not received yet"""
+        if self.pending is not None:
+            self.dropped_updates += 1
+        self.pending = payload
+        self.ready.set()
+
+    async def run(self):
+        """Write payloads to the client until it goes away or stalls"""
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+                payload, self.pending = self.pending, None
+                if payload is None:
+                    continue
+                await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+        except Exception:
+            # Disconnected or too slow for send_timeout: stop writing to it
+            self.closed = True
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+class GameBroadcaster:
+    """Encodes each update of one game once and shares it with all its viewers"""
+
+    def __init__(self, game_id: str, get_payload: Callable[[str], Optional[str]], interval: float, send_timeout: float):
+        self.game_id = game_id
+        self.get_payload = get_payload
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.subscribers: Set[Subscriber] = set()
+        self.last_payload: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, websocket) -> Subscriber:
+        subscriber = Subscriber(websocket, self.send_timeout)
+        subscriber.task = asyncio.create_task(subscriber.run())
+        self.subscribers.add(subscriber)
+        # New viewers get the current state right away
+        if self.last_payload is not None:
+            subscriber.offer(self.last_payload)
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll())
+        return subscriber
+
+    def remove(self, subscriber: Subscriber):
+        subscriber.close()
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _poll(self):
+        """Publish the game status whenever it changes"""
+        while True:
+            payload = self.get_payload(self.game_id)
+            # Cached payloads are the same object until the game changes
+            if payload is not None and payload is not self.last_payload:
+                self.last_payload = payload
+                for subscriber in list(self.subscribers):
+                    if subscriber.closed:
+                        self.subscribers.discard(subscriber)
+                    else:
+                        subscriber.offer(payload)
+            await asyncio.sleep(self.interval)
+
+
+class BroadcastHub:
+    """Broadcasters for every game with at least one viewer"""
+
+    def __init__(self, get_payload: Callable[[str], Optional[str]], interval: float = 1.0, send_timeout: float = 5.0):
+        self.get_payload = get_payload
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.games: Dict[str, GameBroadcaster] = {}
+
+    def subscribe(self, game_id: str, websocket) -> Subscriber:
+        """Start streaming the status of game_id to websocket"""
+        broadcaster = self.games.get(game_id)
+        if broadcaster is None:
+            broadcaster = GameBroadcaster(game_id, self.get_payload, self.interval, self.send_timeout)
+            self.games[game_id] = broadcaster
+        return broadcaster.add(websocket)
+
+    def unsubscribe(self, game_id: str, subscriber: Subscriber):
+        """Stop streaming to a viewer"""
+        broadcaster = self.games.get(game_id)
+        if broadcaster is None:
+            return
+        broadcaster.remove(subscriber)
+        if not broadcaster.subscribers:
+            del self.games[game_id]
+
+    def stats(self) -> Dict:
+        """Viewer counts per game"""
+        return {
+            game_id: {
+                "viewers": len(broadcaster.subscribers),
+                "dropped_updates": sum(s.dropped_updates for s in broadcaster.subscribers)
+            }
+            for game_id, broadcaster in self.games.items()
+        }
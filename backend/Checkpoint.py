@@ -0,0 +1,247 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+import orjson
+
+from DefenseServer import GameState, NavalBattleFSM, Ship
+from AttackClient import AttackClientFSM, AttackMode
+
+
+##########* Snapshots *##############
+
+def snapshot_defense(fsm: NavalBattleFSM) -> Dict:
+    """Copy of everything needed to rebuild a defense game"""
+    return {
+        "game_id": fsm.game_id,
+        "state": fsm.current_state.value,
+        "ships": [
+            {"name": ship.name, "positions": sorted(ship.positions), "hits": sorted(ship.hits)}
+            for ship in fsm.ships
+        ],
+        "attacks": sorted(fsm.all_attacks),
+        "version": fsm.version,
+        "created_at": fsm.created_at,
+        "last_attack_at": fsm.last_attack_at,
+        "terminated": fsm.terminated,
+    }
+
+
+def restore_defense(data: Dict) -> NavalBattleFSM:
+    fsm = NavalBattleFSM(data["game_id"])
+    for ship_data in data["ships"]:
+        ship = Ship(ship_data["name"], ship_data["positions"])
+        ship.hits = set(ship_data["hits"])
+        ship.is_sunk = len(ship.hits) == len(ship.positions)
+        fsm.ships.append(ship)
+    fsm.all_attacks = set(data["attacks"])
+    fsm.current_state = GameState(data["state"])
+    fsm.version = data["version"]
+    fsm.created_at = data["created_at"]
+    fsm.last_attack_at = data["last_attack_at"]
+    fsm.terminated = data.get("terminated", False)
+    return fsm
+
+
+def snapshot_attack(game_id: str, fsm: AttackClientFSM) -> Dict:
+    """Copy of everything needed to rebuild an attack game"""
+    return {
+        "game_id": game_id,
+        "total_attacks": fsm.total_attacks,
+        "hits": fsm.hits,
+        "misses": fsm.misses,
+        "sunk_ships": fsm.sunk_ships,
+        "game_won": fsm.game_won,
+        "version": fsm.version,
+        "mode": fsm.mode.value,
+        "target_queue": list(fsm.target_queue),
+        # Only attacked cells, the rest is water
+        "grid": {pos: fsm.attack_board.grid[pos] for pos in fsm.attack_board.attacks},
+    }
+
+
+def restore_attack(data: Dict) -> AttackClientFSM:
+    fsm = AttackClientFSM()
+    fsm.total_attacks = data["total_attacks"]
+    fsm.hits = data["hits"]
+    fsm.misses = data["misses"]
+    fsm.sunk_ships = data["sunk_ships"]
+    fsm.game_won = data["game_won"]
+    fsm.version = data["version"]
+    fsm.attack_board.grid.update(data["grid"])
+    fsm.attack_board.attacks = set(data["grid"])
+    # Checkpoints written before the hunt/target modes resume hunting
+    fsm.mode = AttackMode(data.get("mode", AttackMode.DONE.value if fsm.game_won else AttackMode.HUNT.value))
+    fsm.target_queue = list(data.get("target_queue", []))
+    return fsm
+
+
+##########* Checkpointer *##############
+
+class Checkpointer:
+    """Writes dirty games to disk in the background
+
+    Games are marked dirty when they change. Every interval seconds the dirty
+    games are copied on the event loop (a few microseconds each) and the copies
+    are written by a worker thread. There is one file per live game, so
+    restoring takes time proportional to the live games. Files are written to
+    a temporary name, the batch is fsynced, then renamed into place.
+    """
+
+    KINDS = ("defense", "attack")
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        self.directory = directory
+        self.interval = interval
+        for kind in self.KINDS:
+            os.makedirs(os.path.join(directory, kind), exist_ok=True)
+        self.dirty: Dict[str, Set[str]] = {kind: set() for kind in self.KINDS}
+        self.removed: Dict[str, Set[str]] = {kind: set() for kind in self.KINDS}
+        self.task: Optional[asyncio.Task] = None
+        # Write running in a worker thread: (future, dirty, removed) of its batch
+        self.in_flight: Optional[tuple] = None
+        self.checkpoints = 0
+        self.last_duration = 0.0
+
+    def mark(self, kind: str, game_id: str):
+        """Schedule game_id for the next checkpoint"""
+        self.dirty[kind].add(game_id)
+        self.removed[kind].discard(game_id)
+
+    def mark_removed(self, kind: str, game_id: str):
+        """Delete the checkpoint of a game that no longer exists"""
+        self.dirty[kind].discard(game_id)
+        self.removed[kind].add(game_id)
+
+    def on_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener"""
+        if fsm.last_attack_recorded:
+            self.dirty["defense"].add(fsm.game_id)
+
+    def _path(self, kind: str, game_id: str) -> str:
+        return os.path.join(self.directory, kind, quote(game_id, safe='') + ".json")
+
+    def collect(self, defense_games: Dict[str, NavalBattleFSM], attack_games: Dict[str, AttackClientFSM]) -> Tuple[List, List]:
+        """Copy the dirty games. Must run on the thread that mutates them"""
+        writes = []
+        for game_id in self.dirty["defense"]:
+            fsm = defense_games.get(game_id)
+            if fsm is not None:
+                writes.append((self._path("defense", game_id), snapshot_defense(fsm)))
+        for game_id in self.dirty["attack"]:
+            fsm = attack_games.get(game_id)
+            if fsm is not None:
+                writes.append((self._path("attack", game_id), snapshot_attack(game_id, fsm)))
+        deletes = [self._path(kind, game_id) for kind in self.KINDS for game_id in self.removed[kind]]
+        for kind in self.KINDS:
+            self.dirty[kind] = set()
+            self.removed[kind] = set()
+        return writes, deletes
+
+    def requeue(self, dirty: Dict[str, Set[str]], removed: Dict[str, Set[str]]):
+        """Mark a batch again after its write failed, unless the games changed since"""
+        for kind in self.KINDS:
+            for game_id in dirty[kind]:
+                if game_id not in self.removed[kind]:
+                    self.dirty[kind].add(game_id)
+            for game_id in removed[kind]:
+                if game_id not in self.dirty[kind]:
+                    self.removed[kind].add(game_id)
+
+    def write(self, writes: List, deletes: List):
+        """Write a batch of snapshots (runs in a worker thread)"""
+        started = time.perf_counter()
+        pending = []
+        try:
+            for path, snapshot in writes:
+                tmp = path + ".tmp"
+                f = open(tmp, "wb")
+                pending.append((f, tmp, path))
+                f.write(orjson.dumps(snapshot))
+            # One fsync pass for the whole batch before any rename
+            for f, _, _ in pending:
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f, _, _ in pending:
+                f.close()
+        for _, tmp, path in pending:
+            os.replace(tmp, path)
+        for path in deletes:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if pending or deletes:
+            self._fsync_dirs()
+        self.checkpoints += 1
+        self.last_duration = time.perf_counter() - started
+
+    def _fsync_dirs(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        for kind in self.KINDS:
+            fd = os.open(os.path.join(self.directory, kind), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    async def run(self, defense_games: Dict[str, NavalBattleFSM], attack_games: Dict[str, AttackClientFSM]):
+        """Checkpoint loop, start it with asyncio.create_task"""
+        while True:
+            await asyncio.sleep(self.interval)
+            # collect swaps in new sets, keep the old ones in case the write fails
+            dirty = {kind: self.dirty[kind] for kind in self.KINDS}
+            removed = {kind: self.removed[kind] for kind in self.KINDS}
+            writes, deletes = self.collect(defense_games, attack_games)
+            if writes or deletes:
+                future = asyncio.ensure_future(asyncio.to_thread(self.write, writes, deletes))
+                self.in_flight = (future, dirty, removed)
+                # asyncio.wait neither raises the write's error nor cancels it with the loop, stop() waits for it
+                await asyncio.wait({future})
+                await self._finish_write()
+
+    async def _finish_write(self):
+        """Wait for the write in flight, if any, and mark its batch again if it failed"""
+        if self.in_flight is None:
+            return
+        future, dirty, removed = self.in_flight
+        try:
+            await future
+        except Exception as e:
+            print(f"[CHECKPOINT] Error guardando, se reintentará: {e}")
+            self.requeue(dirty, removed)
+        finally:
+            self.in_flight = None
+
+    def start(self, defense_games: Dict[str, NavalBattleFSM], attack_games: Dict[str, AttackClientFSM]):
+        self.task = asyncio.create_task(self.run(defense_games, attack_games))
+
+    async def stop(self, defense_games: Dict[str, NavalBattleFSM], attack_games: Dict[str, AttackClientFSM]):
+        """Cancel the loop, wait for the write in flight and write whatever is still dirty"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        # Two writers would race on the same .tmp files
+        await self._finish_write()
+        self.write(*self.collect(defense_games, attack_games))
+
+    def restore(self, on_defense: Callable[[str, NavalBattleFSM], None], on_attack: Callable[[str, AttackClientFSM], None]) -> int:
+        """Load every checkpointed game. Returns the number of games restored"""
+        restored = 0
+        for kind, restore, callback in (("defense", restore_defense, on_defense), ("attack", restore_attack, on_attack)):
+            folder = os.path.join(self.directory, kind)
+            for name in os.listdir(folder):
+                if not name.endswith(".json"):
+                    continue  # leftovers of an interrupted write
+                try:
+                    with open(os.path.join(folder, name), "rb") as f:
+                        data = orjson.loads(f.read())
+                    callback(unquote(name[:-len(".json")]), restore(data))
+                    restored += 1
+                except Exception as e:
+                    print(f"[CHECKPOINT] No se pudo restaurar {kind}/{name}: {e}")
+        return restored
@@ -0,0 +1,315 @@
+"""Differential conformance runner
+
+Plays randomly generated games through every implementation of the attack
+rules and checks that they return the same result codes and FSM states:
+
+    engine  NavalBattleFSM.process_attack called directly (the reference)
+    http    api_server.handle_attack, the path behind /api/defense/attack
+    tcp     a DefenseServer on localhost, shots pipelined over AttackConnection
+    shared  the engine publishing to a SharedGameTable, states read back from the mapping
+
+The client-side view (AttackClientFSM.process_attack_result / AttackBoard and
+the messages of RESULT_DISPLAY) is checked against the reference results.
+
+Usage: python Conformance.py --games 10000 --seed 1 [--paths engine,http,tcp]
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from DefenseServer import DefenseServer, NavalBattleFSM, random_fleet
+from AttackClient import AttackClientFSM, AttackConnection, RESULT_DISPLAY
+
+ALL_CELLS = [f"{row}{col}" for row in 'ABCDE' for col in '12345']
+INVALID_POSITIONS = ["A0", "A6", "F1", "Z9", "AA1", "1A", "A", "B22"]
+EXPECTED_CELL = {"404-failed": 'O', "202-shocked": 'X', "200-sunken": '#', "500-sunken": '#'}
+
+
+##########* Paths *##############
+
+class ConformancePath:
+    """One implementation of the attack rules"""
+
+    name = "base"
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def play(self, game_id: str, fleet: Dict[str, List[str]], shots: List[str]) -> List[Tuple[str, str]]:
+        """Play shots against a new game. Returns (result, state after the shot) per shot"""
+        raise NotImplementedError
+
+
+class EnginePath(ConformancePath):
+    name = "engine"
+
+    def play(self, game_id, fleet, shots):
+        fsm = NavalBattleFSM(game_id)
+        fsm.place_fleet(fleet)
+        outcomes = []
+        for position in shots:
+            result = fsm.process_attack(position)
+            outcomes.append((result, fsm.current_state.value))
+        return outcomes
+
+
+class HttpPath(ConformancePath):
+    name = "http"
+
+    def start(self):
+        import api_server  # needs the API dependencies (fastapi, pydantic, orjson)
+        self.api = api_server
+
+    def play(self, game_id, fleet, shots):
+        fsm = NavalBattleFSM(game_id)
+        fsm.place_fleet(fleet)
+        self.api.defense_games[game_id] = fsm
+        outcomes = []
+        try:
+            for position in shots:
+                result = self.api.handle_attack(self.api.AttackRequest(position=position), game_id)
+                outcomes.append((result, fsm.current_state.value))
+        finally:
+            del self.api.defense_games[game_id]
+        return outcomes
+
+
+class TcpPath(ConformancePath):
+    name = "tcp"
+
+    def start(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.server = DefenseServer('127.0.0.1', port, keep_running=True)
+        # start() asks for a game interactively when there is none
+        self.server.add_game("conformance-warmup", random_fleet())
+        threading.Thread(target=self.server.start, daemon=True).start()
+
+        deadline = time.time() + 10
+        while True:
+            try:
+                self.connection = AttackConnection('127.0.0.1', port).connect()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def stop(self):
+        self.connection.close()
+
+    def play(self, game_id, fleet, shots):
+        self.server.add_game(game_id, fleet)
+        fsm = self.server.games[game_id]
+        # Server side state after each processed shot
+        states = []
+        fsm.listeners.append(lambda f, *args: states.append(f.current_state.value))
+        try:
+            responses = self.connection.send_salvo(shots, game_id)
+        finally:
+            self.server.remove_game(game_id)
+
+        outcomes = []
+        state_index = 0
+        for _, response in responses:
+            if response.startswith("ERROR"):
+                # Rejected before reaching the FSM
+                outcomes.append((response, states[state_index - 1] if state_index else "q1"))
+            else:
+                outcomes.append((response, states[state_index]))
+                state_index += 1
+        return outcomes
+
+
+class SharedTablePath(ConformancePath):
+    name = "shared"
+
+    def start(self):
+        from SharedTable import SharedGameTable
+        self.directory = tempfile.mkdtemp(prefix="naval-conformance-")
+        self.table = SharedGameTable(os.path.join(self.directory, "games.tbl"), slots=1024)
+
+    def stop(self):
+        self.table.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def play(self, game_id, fleet, shots):
+        fsm = NavalBattleFSM(game_id)
+        fsm.place_fleet(fleet)
+        fsm.listeners.append(self.table.on_shot)
+        self.table.publish(game_id, fsm)
+        outcomes = []
+        try:
+            for position in shots:
+                result = fsm.process_attack(position)
+                record = self.table.read(game_id)
+                cell = record.status()["grid"].get(position.strip().upper())
+                if fsm.last_attack_recorded and cell != EXPECTED_CELL[result]:
+                    result = f"{result} (table shows {cell})"
+                outcomes.append((result, record.state.value))
+        finally:
+            self.table.remove(game_id)
+        return outcomes
+
+
+PATHS: Dict[str, Callable[[], ConformancePath]] = {
+    "engine": EnginePath,
+    "http": HttpPath,
+    "tcp": TcpPath,
+    "shared": SharedTablePath,
+}
+
+
+##########* Games *##############
+
+def generate_game(rng: random.Random) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Random fleet and a shot sequence covering the board, with invalid,
+    repeated and oddly formatted positions mixed in"""
+    fleet = random_fleet(rng)
+    cells = list(ALL_CELLS)
+    rng.shuffle(cells)
+    shots = []
+    for cell in cells:
+        roll = rng.random()
+        if roll < 0.05:
+            shots.append(rng.choice(INVALID_POSITIONS))
+        elif roll < 0.15 and shots:
+            shots.append(rng.choice(shots))
+        if rng.random() < 0.1:
+            cell = rng.choice([cell.lower(), f" {cell} "])
+        shots.append(cell)
+    return fleet, shots
+
+
+def check_client(shots: List[str], outcomes: List[Tuple[str, str]]) -> List[str]:
+    """Feed the reference results to the attacker side and check its view"""
+    problems = []
+    client = AttackClientFSM()
+    expected_hits = 0
+    for position, (result, _) in zip(shots, outcomes):
+        if result not in RESULT_DISPLAY:
+            problems.append(f"result {result!r} has no message in RESULT_DISPLAY")
+        position = position.strip().upper()
+        # The client only sends valid positions it has not attacked yet
+        if position not in ALL_CELLS or position in client.attack_board.attacks:
+            continue
+        client.process_attack_result(position, result)
+        if result != "404-failed":
+            expected_hits += 1
+        if client.attack_board.grid[position] != EXPECTED_CELL.get(result):
+            problems.append(f"{position}: client board shows {client.attack_board.grid[position]!r} for {result}")
+
+    if client.hits != expected_hits:
+        problems.append(f"client counted {client.hits} hits, expected {expected_hits}")
+    won = any(result == "500-sunken" for result, _ in outcomes)
+    if client.game_won != won:
+        problems.append(f"client game_won={client.game_won}, expected {won}")
+    return problems
+
+
+class ConformanceRunner:
+    """Plays generated games through every path and collects disagreements"""
+
+    def __init__(self, paths: List[str], after_game_over: bool = False, max_report: int = 20):
+        if "engine" not in paths:
+            paths = ["engine"] + paths
+        self.paths = [PATHS[name]() for name in paths]
+        self.after_game_over = after_game_over
+        self.max_report = max_report
+        self.mismatches: List[Dict] = []
+        self.mismatch_count = 0
+        self.games = 0
+        self.shots = 0
+
+    def _report(self, mismatch: Dict):
+        self.mismatch_count += 1
+        if len(self.mismatches) < self.max_report:
+            self.mismatches.append(mismatch)
+
+    def run(self, games: int, seed: int = 0) -> bool:
+        """Returns true if every path agreed on every shot"""
+        rng = random.Random(seed)
+        for path in self.paths:
+            path.start()
+        try:
+            for index in range(games):
+                self._run_game(f"conformance-{seed}-{index}", *generate_game(rng))
+        finally:
+            for path in self.paths:
+                path.stop()
+        return self.mismatch_count == 0
+
+    def _run_game(self, game_id: str, fleet: Dict[str, List[str]], shots: List[str]):
+        reference, others = self.paths[0], self.paths[1:]
+        expected = reference.play(game_id, fleet, shots)
+        if not self.after_game_over:
+            # Shots after the defeat are handled differently by design (TCP rejects them)
+            for index, (result, _) in enumerate(expected):
+                if result == "500-sunken":
+                    shots = shots[:index + 1]
+                    expected = expected[:index + 1]
+                    break
+
+        self.games += 1
+        self.shots += len(shots)
+
+        for path in others:
+            actual = path.play(game_id, fleet, shots)
+            for index, (position, want, got) in enumerate(zip(shots, expected, actual)):
+                if want != got:
+                    self._report({
+                        "game_id": game_id, "shot": index, "position": position, "fleet": fleet,
+                        reference.name: want, path.name: got
+                    })
+                    break  # later shots of this game would only repeat the same divergence
+
+        for problem in check_client(shots, expected):
+            self._report({"game_id": game_id, "fleet": fleet, "client": problem})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conformance runner between engine, HTTP and TCP paths")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--paths", default="engine,http,tcp", help=f"comma separated, from {', '.join(PATHS)}")
+    parser.add_argument("--after-game-over", action="store_true", help="keep shooting after the last ship sinks")
+    parser.add_argument("--max-report", type=int, default=20)
+    args = parser.parse_args()
+
+    runner = ConformanceRunner([p.strip() for p in args.paths.split(',') if p.strip()], args.after_game_over, args.max_report)
+    started = time.perf_counter()
+
+    # The servers print every shot, keep the output readable
+    stdout = sys.stdout
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        sys.stdout = devnull
+        try:
+            ok = runner.run(args.games, args.seed)
+        finally:
+            sys.stdout = stdout
+
+    elapsed = time.perf_counter() - started
+    print(f"Rutas: {', '.join(p.name for p in runner.paths)}")
+    print(f"{runner.games} partidas, {runner.shots} disparos en {elapsed:.1f}s")
+    if ok:
+        print("✅ Todas las rutas coinciden")
+        return
+    print(f"❌ {runner.mismatch_count} diferencias (mostrando {len(runner.mismatches)}):")
+    for mismatch in runner.mismatches:
+        print(f"  {mismatch}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
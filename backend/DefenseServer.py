@@ -1,7 +1,20 @@
+import argparse
+import json
+import random
 import socket
+import sys
 import threading
+import time
+import zlib
 from enum import Enum
-from typing import Dict, List, Tuple, Set
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Set
+
+# Standard fleet: (setup key, ship name, size)
+FLEET = (
+    ("battleship", "Battleship", 3),
+    ("submarine", "Submarine", 2),
+    ("destroyer", "Destroyer", 1),
+)
 
 class GameState(Enum):
     """FSM STATES FOR THE NAVAL BATTLE"""
@@ -50,6 +63,13 @@ class NavalBattleFSM:
         self.current_state = GameState.INITIAL
         self.ships: List[Ship] = []
         self.all_attacks: Set[str] = set()
+        self.version = 0  # bumped on every recorded attack, used to cache status payloads
+        self.created_at = time.time()
+        self.last_attack_at: Optional[float] = None
+        # Called after every attack as listener(fsm, position, result, previous_state, elapsed_ns)
+        self.listeners: List[Callable] = []
+        self.last_attack_recorded = False  # false for invalid or repeated positions
+        self.terminated = False  # ended by an admin, see terminate
 
     def setup_fleet(self):
         """Setup the fleet with ships"""
@@ -106,6 +126,11 @@ class NavalBattleFSM:
         print("Flota colocada correctamente para Game ID: {self.game_id}")
         self._display_fleet()
 
+    def place_fleet(self, ships_data: Dict[str, List[str]]):
+        """Setup the fleet programmatically from {"battleship": [...], ...}"""
+        self.ships = [Ship(name, ships_data.get(key, [])) for key, name, _ in FLEET]
+        self.current_state = GameState.FLEET_INTACT
+
     def _is_valid_position(self, position: str) -> bool:
         """Validate if position is within grid bounds"""
         if len(position) != 2:
@@ -124,7 +149,23 @@ class NavalBattleFSM:
 
     def process_attack(self, position: str) -> str:
         """process an attack and return response code"""
+        if not self.listeners:
+            return self._process_attack(position)
+
+        previous_state = self.current_state
+        started = time.perf_counter_ns()
+        result = self._process_attack(position)
+        elapsed_ns = time.perf_counter_ns() - started
+        for listener in self.listeners:
+            listener(self, position.strip().upper(), result, previous_state, elapsed_ns)
+        return result
+
+    def _process_attack(self, position: str) -> str:
         position = position.strip().upper()
+        self.last_attack_recorded = False
+
+        if self.terminated:
+            return "404-failed"
 
         #Validate position format
         if not self._is_valid_position(position):
@@ -136,6 +177,9 @@ class NavalBattleFSM:
 
         #add to attack history
         self.all_attacks.add(position)
+        self.version += 1
+        self.last_attack_recorded = True
+        self.last_attack_at = time.time()
 
         #check if position hits any ship
         hit_ship = None
@@ -177,19 +221,121 @@ class NavalBattleFSM:
         else:
             self.current_state = GameState.FLEET_INTACT
 
+    def terminate(self):
+        """End the game from outside: it moves to DEFEAT and later attacks are not recorded"""
+        self.terminated = True
+        self.current_state = GameState.DEFEAT
+        self.version += 1
+
     def is_game_over(self) -> bool:
         """check if game is over"""
         return self.current_state == GameState.DEFEAT
     
+def random_fleet(rng: random.Random = None) -> Dict[str, List[str]]:
+    """Random non-overlapping straight placement of the standard fleet"""
+    rng = rng or random.Random()
+    taken: Set[str] = set()
+    fleet = {}
+    for key, _, size in FLEET:
+        while True:
+            horizontal = rng.random() < 0.5
+            row = rng.randrange(5 if horizontal else 6 - size)
+            col = rng.randrange(6 - size if horizontal else 5)
+            cells = [
+                f"{'ABCDE'[row + (0 if horizontal else i)]}{'12345'[col + (i if horizontal else 0)]}"
+                for i in range(size)
+            ]
+            if taken.isdisjoint(cells):
+                break
+        taken.update(cells)
+        fleet[key] = cells
+    return fleet
+
+class GameRegistry:
+    """Thread-safe map of game_id -> NavalBattleFSM split into shards
+
+    Each shard has its own lock, so lookups and attacks on different games
+    rarely contend. The same lock serializes the attacks on one game.
+    """
+
+    def __init__(self, shards: int = 64):
+        self.shards: List[Dict[str, NavalBattleFSM]] = [{} for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def _index(self, game_id: str) -> int:
+        # Stable across processes, unlike hash() on str
+        return zlib.crc32(game_id.encode('utf-8')) % len(self.shards)
+
+    def lock(self, game_id: str) -> threading.Lock:
+        """Lock guarding game_id"""
+        return self.locks[self._index(game_id)]
+
+    def add(self, game_id: str, fsm: NavalBattleFSM) -> bool:
+        """Register a game. Returns false if the id is taken"""
+        index = self._index(game_id)
+        with self.locks[index]:
+            if game_id in self.shards[index]:
+                return False
+            self.shards[index][game_id] = fsm
+            return True
+
+    def remove(self, game_id: str) -> Optional[NavalBattleFSM]:
+        index = self._index(game_id)
+        with self.locks[index]:
+            return self.shards[index].pop(game_id, None)
+
+    def get(self, game_id: str) -> Optional[NavalBattleFSM]:
+        return self.shards[self._index(game_id)].get(game_id)
+
+    def __getitem__(self, game_id: str) -> NavalBattleFSM:
+        return self.shards[self._index(game_id)][game_id]
+
+    def __setitem__(self, game_id: str, fsm: NavalBattleFSM):
+        index = self._index(game_id)
+        with self.locks[index]:
+            self.shards[index][game_id] = fsm
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self.shards[self._index(game_id)]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def __iter__(self) -> Iterator[str]:
+        for index, shard in enumerate(self.shards):
+            with self.locks[index]:
+                game_ids = list(shard)
+            yield from game_ids
+
+    def values(self) -> Iterator[NavalBattleFSM]:
+        for index, shard in enumerate(self.shards):
+            with self.locks[index]:
+                games = list(shard.values())
+            yield from games
+
 class DefenseServer:
     """TCP Server for handling attacks"""
 
-    def __init__(self, host='localhost', port=5000):
+    # Seconds to wait for the newline of a first message before treating it as a legacy single shot
+    legacy_wait = 0.1
+
+    def __init__(self, host='localhost', port=5000, control_port: Optional[int] = None,
+                 control_host: str = '127.0.0.1', keep_running: bool = False, interactive: bool = True):
         self.host = host
         self.port = port
-        self.games: Dict[str, NavalBattleFSM] = {}
+        self.games = GameRegistry()
         self.socket = None
         self.default_game_id = "default"
+        # Control channel to add/remove/inspect games while the server runs
+        self.control_host = control_host
+        self.control_port = control_port
+        self.control_socket = None
+        # Keep accepting attacks after every game is over
+        self.keep_running = keep_running or control_port is not None
+        # Attached to every game, see NavalBattleFSM.listeners
+        self.game_listeners: List[Callable] = []
+        # Ask for a game on the terminal when start() finds none (off for automated deployments)
+        self.interactive = interactive
     
     def start(self):
         """Start the defense server"""
@@ -197,18 +343,21 @@ class DefenseServer:
         print("║         [ SERVIDOR DE DEFENSA - FSM ]     ║")
         print("╚══════════════════════════════════════════╝")
 
-        # Get game ID for this server instance
-        game_id = input(f"Ingrese Game ID (Enter para '{self.default_game_id}'): ").strip()
-        if not game_id:
-            game_id = self.default_game_id
+        # Preconfigured games (add_game / config file / control channel) skip the interactive setup
+        if self.interactive and not self.games and self.control_port is None:
+            # Get game ID for this server instance
+            game_id = input(f"Ingrese Game ID (Enter para '{self.default_game_id}'): ").strip()
+            if not game_id:
+                game_id = self.default_game_id
 
-        #setup fleet
-        fsm = NavalBattleFSM(game_id)
-        fsm.setup_fleet()
-        self.games[game_id] = fsm
+            #setup fleet
+            fsm = NavalBattleFSM(game_id)
+            fsm.setup_fleet()
+            fsm.listeners.extend(self.game_listeners)
+            self.games[game_id] = fsm
 
-        print(f"\n🎮 Juego registrado con Game ID: '{game_id}'")
-        print(f"🎯 Los ataques deben incluir este Game ID para ser procesados")
+            print(f"\n🎮 Juego registrado con Game ID: '{game_id}'")
+        print(f"🎯 Los ataques deben incluir el Game ID para ser procesados")
 
         #start server
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -222,7 +371,10 @@ class DefenseServer:
             print(f"🌐 Servidor iniciado:")
             print(f"   Host: {self.host}")
             print(f"   Puerto: {self.port}")
-            print(f"   Game ID activo: {game_id}")
+            print(f"   Juegos activos: {len(self.games)}")
+            if self.control_port is not None:
+                self._start_control_channel()
+                print(f"   Control: {self.control_host}:{self.control_port}")
 
             if self.host == 'localhost':
                 print(f"   IP Local: 127.0.0.1")
@@ -237,8 +389,8 @@ class DefenseServer:
             print(f"Esperando ataques en {self.host}:{self.port}...")
             print("───────────────────────────────────────────")
 
-            # Keep server running until all games are over
-            while any(not game.is_game_over() for game in self.games.values()):
+            # Keep server running until all games are over (or forever with keep_running)
+            while self.keep_running or any(not game.is_game_over() for game in self.games.values()):
                 try:
                     client_socket, addr = self.socket.accept()
                     thread = threading.Thread(target=self._handle_attack, args=(client_socket, addr))
@@ -253,63 +405,47 @@ class DefenseServer:
         finally:
             if self.socket:
                 self.socket.close()
+            if self.control_socket:
+                self.control_socket.close()
 
     def _handle_attack(self, client_socket, addr):
-        """Handle individual attack from client"""
+        """Handle attacks from a client
+
+        Legacy clients send one message without a trailing newline and get one
+        response before the socket is closed. Clients that end each message with
+        a newline keep the connection open and may pipeline several shots; the
+        responses come back newline-terminated and in the same order. A first
+        message split across segments is told apart by waiting legacy_wait
+        seconds for its newline.
+        """
         try:
                 #receive attack
-                data = client_socket.recv(1024).decode('utf-8').strip()
-                if not data:
-                    return
-            
-                print(f"ataque recibido de {addr}: {data}")
-
-                # Parse attack data (expecting format: "GAME_ID:POSITION" or just "POSITION")
-                if ':' in data:
-                    game_id, position = data.split(':', 1)
-                else:
-                    # Use default game if no game_id specified
-                    position = data
-                    game_id = self.default_game_id
-
-                # Check if game exists
-                if game_id not in self.games:
-                    response = f"ERROR: Game ID '{game_id}' not found"
-                    client_socket.send(response.encode('utf-8'))
-                    print(f"❌ {response}")
+                data = client_socket.recv(1024).decode('utf-8')
+                if not data.strip():
                     return
 
-                # Get the appropriate game FSM
-                fsm = self.games[game_id]
+                if '\n' not in data:
+                    data = self._wait_for_newline(client_socket, data)
 
-                # Check if game is already over
-                if fsm.is_game_over():
-                    response = "ERROR: Game already over"
+                if '\n' not in data:
+                    # Single shot connection
+                    response = self._process_message(data.strip(), addr)
                     client_socket.send(response.encode('utf-8'))
-                    print(f"❌ {response}")
                     return
-                
-                # Process attack with FSM
-                response = fsm.process_attack(position)
-
-                # Send response
-                client_socket.send(response.encode('utf-8'))
-
-                # Display response
-                result_msg = {
-                    "404-failed": "404-failed (Agua)",
-                    "202-shocked": "202-shocked (¡Impacto!)",
-                    "200-sunken": "200-sunken (¡Barco hundido!)",
-                    "500-sunken": "500-sunken (¡Último barco hundido!)"
-                }
 
-                print(f"📤 Resultado para Game ID '{game_id}': {result_msg.get(response, response)}")
-
-                if response == "500-sunken":
-                    print(f"🏴 Juego '{game_id}': Toda la flota ha sido destruida. Fin del juego.") 
-                    self._display_final_state(game_id)
-
-                fsm._display_fleet()
+                # Persistent connection: answer every complete line, keep the rest
+                buffer = data
+                while True:
+                    *lines, buffer = buffer.split('\n')
+                    responses = [self._process_message(line.strip(), addr) for line in lines if line.strip()]
+                    if responses:
+                        # One write for the whole pipelined batch
+                        client_socket.sendall(('\n'.join(responses) + '\n').encode('utf-8'))
+
+                    chunk = client_socket.recv(4096)
+                    if not chunk:
+                        break
+                    buffer += chunk.decode('utf-8')
         
         except Exception as e:
             print(f"Error manejando ataque: {e}")
@@ -320,6 +456,79 @@ class DefenseServer:
                 pass
         finally:
             client_socket.close()
+
+    def _wait_for_newline(self, client_socket, data: str) -> str:
+        """Keep reading the first message until a newline, the peer closes or legacy_wait runs out"""
+        deadline = time.monotonic() + self.legacy_wait
+        previous_timeout = client_socket.gettimeout()
+        try:
+            while '\n' not in data:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                client_socket.settimeout(remaining)
+                try:
+                    chunk = client_socket.recv(1024)
+                except socket.timeout:
+                    break
+                if not chunk:
+                    break
+                data += chunk.decode('utf-8')
+        finally:
+            client_socket.settimeout(previous_timeout)
+        return data
+
+    def _process_message(self, data: str, addr) -> str:
+        """Process one attack message and return the response to send"""
+        print(f"ataque recibido de {addr}: {data}")
+
+        # Parse attack data (expecting format: "GAME_ID:POSITION" or just "POSITION")
+        if ':' in data:
+            game_id, position = data.split(':', 1)
+        else:
+            # Use default game if no game_id specified
+            position = data
+            game_id = self.default_game_id
+
+        # Check if game exists
+        if game_id not in self.games:
+            response = f"ERROR: Game ID '{game_id}' not found"
+            print(f"❌ {response}")
+            return response
+
+        # Get the appropriate game FSM
+        fsm = self.games.get(game_id)
+        if fsm is None:
+            response = f"ERROR: Game ID '{game_id}' not found"
+            print(f"❌ {response}")
+            return response
+
+        with self.games.lock(game_id):
+            # Check if game is already over
+            if fsm.is_game_over():
+                response = "ERROR: Game already over"
+                print(f"❌ {response}")
+                return response
+
+            # Process attack with FSM
+            response = fsm.process_attack(position)
+
+        # Display response
+        result_msg = {
+            "404-failed": "404-failed (Agua)",
+            "202-shocked": "202-shocked (¡Impacto!)",
+            "200-sunken": "200-sunken (¡Barco hundido!)",
+            "500-sunken": "500-sunken (¡Último barco hundido!)"
+        }
+
+        print(f"📤 Resultado para Game ID '{game_id}': {result_msg.get(response, response)}")
+
+        if response == "500-sunken":
+            print(f"🏴 Juego '{game_id}': Toda la flota ha sido destruida. Fin del juego.") 
+            self._display_final_state(game_id)
+
+        fsm._display_fleet()
+        return response
     
     def _display_final_state(self, game_id: str):
         """Display final game state"""
@@ -332,30 +541,33 @@ class DefenseServer:
 
     def add_game(self, game_id: str, ships_data: Dict = None):
         """Add a new game programmatically (for API integration)"""
-        if game_id in self.games:
-            return False
-        
         fsm = NavalBattleFSM(game_id)
+        fsm.listeners.extend(self.game_listeners)
         
         if ships_data:
             # Setup fleet programmatically
-            fsm.ships = [
-                Ship("Battleship", ships_data.get("battleship", [])),
-                Ship("Submarine", ships_data.get("submarine", [])),
-                Ship("Destroyer", ships_data.get("destroyer", []))
-            ]
-            fsm.current_state = GameState.FLEET_INTACT
+            fsm.place_fleet(ships_data)
         
-        self.games[game_id] = fsm
+        if not self.games.add(game_id, fsm):
+            return False
         print(f"🎮 Nuevo juego añadido: Game ID '{game_id}'")
         return True
+
+    def remove_game(self, game_id: str) -> bool:
+        """Remove a game. Returns false if it did not exist"""
+        if self.games.remove(game_id) is None:
+            return False
+        print(f"🗑 Juego eliminado: Game ID '{game_id}'")
+        return True
     
     def get_game_status(self, game_id: str):
         """Get status of a specific game"""
-        if game_id not in self.games:
+        fsm = self.games.get(game_id)
+        if fsm is None:
             return None
-        
-        fsm = self.games[game_id]
+
+        hits = sum(len(ship.hits) for ship in fsm.ships)
+        total_attacks = len(fsm.all_attacks)
         return {
             "game_id": game_id,
             "state": fsm.current_state.value,
@@ -368,28 +580,206 @@ class DefenseServer:
                 }
                 for ship in fsm.ships
             ],
-            "total_attacks": len(fsm.all_attacks),
+            "total_attacks": total_attacks,
+            "hits": hits,
+            "misses": total_attacks - hits,
+            "accuracy": round(hits / total_attacks * 100, 1) if total_attacks else 0,
+            "sunk_ships": sum(1 for ship in fsm.ships if ship.is_sunk),
+            "created_at": fsm.created_at,
+            "last_attack_at": fsm.last_attack_at,
             "is_game_over": fsm.is_game_over()
         }
 
-def main():
+    def _start_control_channel(self):
+        """Listen for control commands in a background thread"""
+        self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.control_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.control_socket.bind((self.control_host, self.control_port))
+        self.control_socket.listen(5)
+
+        def accept_loop():
+            while True:
+                try:
+                    conn, addr = self.control_socket.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._handle_control, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+
+    def _handle_control(self, conn):
+        """Answer newline-terminated control commands until the client disconnects"""
+        buffer = b""
+        try:
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                # Split before decoding, a chunk may end inside a multi-byte character
+                *lines, buffer = (buffer + chunk).split(b'\n')
+                lines = [line.decode('utf-8', errors='replace').strip() for line in lines]
+                responses = [self._safe_control_command(line) for line in lines if line]
+                if responses:
+                    conn.sendall(('\n'.join(responses) + '\n').encode('utf-8'))
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def _safe_control_command(self, command: str) -> str:
+        """control_command, with any error as the response so the rest of a pipelined batch still runs"""
+        try:
+            return self.control_command(command)
+        except Exception as e:
+            return f"ERROR: {type(e).__name__}: {e}"
+
+    def control_command(self, command: str) -> str:
+        """Run one control command and return a one-line response
+
+        ADD <game_id> [fleet JSON]   register a game (random fleet if omitted)
+        REMOVE <game_id>             remove a game
+        STATUS <game_id>             get_game_status as JSON
+        LIST [offset] [limit]        game ids as JSON
+        STATS                        number of games, active and finished
+        """
+        parts = command.split(None, 2)
+        action = parts[0].upper()
+        try:
+            if action == "ADD" and len(parts) >= 2:
+                fleet = json.loads(parts[2]) if len(parts) == 3 else random_fleet()
+                validate_fleet(fleet)
+                return "OK" if self.add_game(parts[1], fleet) else f"ERROR: Game ID '{parts[1]}' already exists"
+            if action == "REMOVE" and len(parts) == 2:
+                return "OK" if self.remove_game(parts[1]) else f"ERROR: Game ID '{parts[1]}' not found"
+            if action == "STATUS" and len(parts) == 2:
+                status = self.get_game_status(parts[1])
+                return json.dumps(status) if status else f"ERROR: Game ID '{parts[1]}' not found"
+            if action == "LIST":
+                offset = int(parts[1]) if len(parts) > 1 else 0
+                limit = int(parts[2]) if len(parts) > 2 else 100
+                game_ids = []
+                for index, game_id in enumerate(self.games):
+                    if index >= offset + limit:
+                        break
+                    if index >= offset:
+                        game_ids.append(game_id)
+                return json.dumps(game_ids)
+            if action == "STATS":
+                total = 0
+                finished = 0
+                for fsm in self.games.values():
+                    total += 1
+                    finished += fsm.is_game_over()
+                return json.dumps({"games": total, "active": total - finished, "finished": finished})
+        except (ValueError, KeyError) as e:
+            return f"ERROR: {e}"
+        return f"ERROR: Unknown command '{command}'"
+
+def validate_fleet(ships_data: Dict[str, List[str]]):
+    """Raise ValueError if the fleet is not a valid standard fleet"""
+    if not isinstance(ships_data, dict):
+        raise ValueError("La flota debe ser un objeto {barco: [casillas]}")
+    taken = set()
+    for key, name, size in FLEET:
+        positions = ships_data.get(key, [])
+        if not isinstance(positions, list) or not all(isinstance(pos, str) for pos in positions):
+            raise ValueError(f"{name} debe ser una lista de casillas")
+        positions = [pos.strip().upper() for pos in positions]
+        if len(positions) != size:
+            raise ValueError(f"{name} necesita exactamente {size} casillas")
+        for pos in positions:
+            if len(pos) != 2 or pos[0] not in 'ABCDE' or pos[1] not in '12345':
+                raise ValueError(f"Posición inválida para {name}: {pos}")
+            if pos in taken:
+                raise ValueError(f"Posición ya ocupada por otro barco: {pos}")
+            taken.add(pos)
+
+def load_games(server: DefenseServer, games: List[Dict], seed: int = None):
+    """Register games described as {"game_id": ..., "fleet": {...}} or {"game_id": ..., "random_fleet": true}"""
+    rng = random.Random(seed)
+    for game in games:
+        game_id = game["game_id"]
+        if game.get("fleet"):
+            fleet = {key: [pos.strip().upper() for pos in positions] for key, positions in game["fleet"].items()}
+        else:
+            fleet = random_fleet(rng)
+        validate_fleet(fleet)
+        if not server.add_game(game_id, fleet):
+            raise ValueError(f"Game ID repetido: {game_id}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de defensa (TCP). Sin argumentos pregunta la configuración")
+    parser.add_argument("--config", help="archivo JSON con host, port y games")
+    parser.add_argument("--host", help="IP del servidor (por defecto localhost)")
+    parser.add_argument("--port", type=int, help="puerto (por defecto 5000)")
+    parser.add_argument("--game", action="append", default=[], metavar="GAME_ID",
+                        help="registrar un juego con flota aleatoria (repetible)")
+    parser.add_argument("--fleet", help="flota para los juegos de --game, ej: 'A1 A2 A3,C1 C2,E5'")
+    parser.add_argument("--seed", type=int, help="semilla para las flotas aleatorias")
+    parser.add_argument("--control-port", type=int, help="puerto del canal de control (ADD/REMOVE/STATUS/LIST/STATS)")
+    parser.add_argument("--control-host", help="IP del canal de control (por defecto 127.0.0.1)")
+    parser.add_argument("--serve-forever", action="store_true", help="seguir aceptando ataques cuando terminen los juegos")
+    parser.add_argument("--export-dir", help="exportar disparos y partidas a este directorio")
+    parser.add_argument("--export-format", choices=["csv", "parquet", "arrow"],
+                        help="formato de exportación, csv por defecto (parquet/arrow necesitan pyarrow)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    exporter = None
     try:
-        #get server configuration
-        host = input("Ingrese la IP del servidor (Enter para el localhost): ").strip()
-        if not host:
-            host = 'localhost'
+        args = parse_args(argv)
+        config = {}
+        if args.config:
+            with open(args.config, encoding='utf-8') as f:
+                config = json.load(f)
+
+        games = list(config.get("games", []))
+        fleet = None
+        if args.fleet:
+            parts = [part.split() for part in args.fleet.upper().split(',')]
+            fleet = {key: positions for (key, _, _), positions in zip(FLEET, parts)}
+        games += [{"game_id": game_id, "fleet": fleet} for game_id in args.game]
+
+        control_port = args.control_port or config.get("control_port")
+        headless = bool(args.config or args.host or args.port or games or control_port)
+        if headless and not games and not control_port:
+            # Nothing could ever add a game, and prompting would block an automated start
+            print("Error: sin juegos. Use --game, 'games' en --config o --control-port")
+            sys.exit(2)
+        if headless:
+            host = args.host or config.get("host", 'localhost')
+            port = args.port or int(config.get("port", 5000))
+        else:
+            #get server configuration
+            host = input("Ingrese la IP del servidor (Enter para el localhost): ").strip()
+            if not host:
+                host = 'localhost'
 
-        port_input = input("Ingrese el puerto (Enter para 5000): ").strip()
-        port = int(port_input) if port_input else 5000
+            port_input = input("Ingrese el puerto (Enter para 5000): ").strip()
+            port = int(port_input) if port_input else 5000
 
         #start server
-        server = DefenseServer(host, port)
+        server = DefenseServer(host, port, control_port=control_port,
+                               control_host=args.control_host or config.get("control_host", '127.0.0.1'),
+                               keep_running=args.serve_forever or config.get("serve_forever", False),
+                               interactive=not headless)
+
+        export_dir = args.export_dir or config.get("export_dir")
+        if export_dir:
+            from AnalyticsExport import GameExporter
+            exporter = GameExporter(export_dir, args.export_format or config.get("export_format") or "csv")
+            server.game_listeners.append(exporter.record_shot)
+
+        load_games(server, games, args.seed if args.seed is not None else config.get("seed"))
         server.start()
 
     except KeyboardInterrupt:
         print("\n🛑 Servidor detenido por el usuario.")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        if exporter is not None:
+            exporter.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
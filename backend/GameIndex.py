@@ -0,0 +1,150 @@
+import time
+from bisect import bisect_right, insort
+from itertools import count
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from DefenseServer import GameState, NavalBattleFSM
+
+
+class TimeOrder:
+    """Game ids sorted by (time, game_id), readable from any (time, game_id) position
+
+    Setting a time appends an entry (insorts it when it is older than the last
+    one) and removing a game only forgets its time: stale entries are skipped
+    on reads and compacted once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.entries: List[tuple] = []  # (time, game_id, generation)
+        self.times: Dict[str, tuple] = {}  # game_id -> (time, generation)
+        self.generations = count()
+        self.stale = 0
+
+    def set(self, game_id: str, timestamp: float):
+        current = self.times.get(game_id)
+        if current is not None:
+            if current[0] == timestamp:
+                return
+            self.stale += 1
+        generation = next(self.generations)
+        self.times[game_id] = (timestamp, generation)
+        entry = (timestamp, game_id, generation)
+        if not self.entries or entry > self.entries[-1]:
+            self.entries.append(entry)
+        else:
+            insort(self.entries, entry)
+        self._compact()
+
+    def discard(self, game_id: str):
+        if self.times.pop(game_id, None) is not None:
+            self.stale += 1
+            self._compact()
+
+    def _compact(self):
+        if self.stale > 64 and self.stale > len(self.times):
+            self.entries = [entry for entry in self.entries if self.times.get(entry[1]) == (entry[0], entry[2])]
+            self.stale = 0
+
+    def get(self, game_id: str) -> Optional[float]:
+        current = self.times.get(game_id)
+        return current[0] if current is not None else None
+
+    def items(self, after: Optional[Tuple[float, str]] = None, until: Optional[float] = None) -> Iterator[Tuple[float, str]]:
+        """(time, game_id) pairs after the given one, oldest first, stopping past until"""
+        entries = self.entries  # compaction swaps the list, this walk keeps the old one
+        start = bisect_right(entries, (after[0], after[1], float("inf"))) if after is not None else 0
+        for index in range(start, len(entries)):
+            timestamp, game_id, generation = entries[index]
+            if until is not None and timestamp > until:
+                return
+            if self.times.get(game_id) == (timestamp, generation):
+                yield timestamp, game_id
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class GameIndex:
+    """Secondary indexes over the defense games, for admin queries that must not scan every game
+
+    by_state   state -> game ids in that state, oldest first
+    created    game ids, oldest first
+    activity   game ids, least recently attacked first
+
+    Every order is kept sorted as games come and go, so a page starts from the
+    (time, game_id) of the previous page's last game. Attach on_shot to
+    NavalBattleFSM.listeners (it runs right after _update_state) and call
+    add/remove when games are registered or dropped.
+    """
+
+    def __init__(self):
+        self.by_state: Dict[str, TimeOrder] = {state.value: TimeOrder() for state in GameState}
+        self.state_of: Dict[str, str] = {}
+        self.created = TimeOrder()
+        self.activity = TimeOrder()
+
+    def add(self, game_id: str, fsm: NavalBattleFSM):
+        self.remove(game_id)
+        state = fsm.current_state.value
+        self.by_state[state].set(game_id, fsm.created_at)
+        self.state_of[game_id] = state
+        self.created.set(game_id, fsm.created_at)
+        self.activity.set(game_id, fsm.last_attack_at or fsm.created_at)
+
+    def remove(self, game_id: str):
+        state = self.state_of.pop(game_id, None)
+        if state is None:
+            return
+        self.by_state[state].discard(game_id)
+        self.created.discard(game_id)
+        self.activity.discard(game_id)
+
+    def move(self, game_id: str, state: GameState):
+        """Move a game to another state bucket"""
+        previous = self.state_of.get(game_id)
+        if previous is None or previous == state.value:
+            return
+        self.by_state[previous].discard(game_id)
+        self.by_state[state.value].set(game_id, self.created.get(game_id))
+        self.state_of[game_id] = state.value
+
+    def on_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener"""
+        if not fsm.last_attack_recorded or fsm.game_id not in self.state_of:
+            return
+        if previous_state is not fsm.current_state:
+            self.move(fsm.game_id, fsm.current_state)
+        self.activity.set(fsm.game_id, fsm.last_attack_at)
+
+    def query(self, state: Optional[GameState] = None, idle_for: Optional[float] = None,
+              older_than: Optional[float] = None, now: Optional[float] = None,
+              after: Optional[Tuple[float, str]] = None) -> Iterator[Tuple[float, str]]:
+        """(time, game_id) of the games matching every given filter, after the pair `after`
+
+        Walks the most selective index (activity time with idle_for, otherwise
+        creation time) and stops at the first game past a time cutoff, so the
+        cost follows the number of matches, not of games. Consume it before
+        the games change.
+        """
+        now = now or time.time()
+        if idle_for is not None:
+            matches = self.activity.items(after, now - idle_for)
+        elif older_than is not None:
+            matches = self.created.items(after, now - older_than)
+        elif state is not None:
+            matches = self.by_state[state.value].items(after)
+        else:
+            matches = self.created.items(after)
+
+        for timestamp, game_id in matches:
+            if state is not None and self.state_of[game_id] != state.value:
+                continue
+            if older_than is not None and self.created.get(game_id) > now - older_than:
+                continue
+            yield timestamp, game_id
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(game_ids) for state, game_ids in self.by_state.items()}
+
+    def __len__(self) -> int:
+        return len(self.state_of)
@@ -0,0 +1,95 @@
+from typing import Dict
+
+import orjson
+
+from DefenseServer import GameState, NavalBattleFSM
+
+CELLS = [f"{row}{col}" for row in 'ABCDE' for col in '12345']
+
+
+class GlobalStats:
+    """Aggregates over every defense game, updated incrementally
+
+    Counters change in O(1) per attack or setup, so reading them never scans
+    the games. Attach record_shot to NavalBattleFSM.listeners and call
+    add_game/remove_game when games are registered or dropped.
+    """
+
+    def __init__(self):
+        self.hits = dict.fromkeys(CELLS, 0)
+        self.misses = dict.fromkeys(CELLS, 0)
+        self.placements = dict.fromkeys(CELLS, 0)
+        self.states = {state.value: 0 for state in GameState}
+        self.games = 0
+        self.fleets_placed = 0
+        self.victories = 0
+        self.shots_to_victory = 0
+        self.version = 0
+        self._payload = None
+        self._payload_version = -1
+
+    def add_game(self, fsm: NavalBattleFSM):
+        """Count a newly registered game and its fleet placement"""
+        self.games += 1
+        self.states[fsm.current_state.value] += 1
+        if fsm.ships:
+            self.fleets_placed += 1
+            for ship in fsm.ships:
+                for position in ship.positions:
+                    if position in self.placements:
+                        self.placements[position] += 1
+        self.version += 1
+
+    def remove_game(self, fsm: NavalBattleFSM):
+        """Stop counting a game in the state distribution (history is kept)"""
+        self.games -= 1
+        self.states[fsm.current_state.value] -= 1
+        self.version += 1
+
+    def move_state(self, previous_state: GameState, fsm: NavalBattleFSM):
+        """Count a state change that did not come from an attack (e.g. terminate)"""
+        self.states[previous_state.value] -= 1
+        self.states[fsm.current_state.value] += 1
+        self.version += 1
+
+    def record_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener"""
+        if not fsm.last_attack_recorded:
+            return
+
+        if result == "404-failed":
+            self.misses[position] += 1
+        else:
+            self.hits[position] += 1
+
+        if previous_state is not fsm.current_state:
+            self.states[previous_state.value] -= 1
+            self.states[fsm.current_state.value] += 1
+
+        if result == "500-sunken":
+            self.victories += 1
+            self.shots_to_victory += len(fsm.all_attacks)
+        self.version += 1
+
+    def snapshot(self) -> Dict:
+        total_hits = sum(self.hits.values())
+        total_misses = sum(self.misses.values())
+        return {
+            "games": self.games,
+            "shots": total_hits + total_misses,
+            "hits": total_hits,
+            "misses": total_misses,
+            "heatmap": {cell: {"hits": self.hits[cell], "misses": self.misses[cell]} for cell in CELLS},
+            "placements": self.placements,
+            "fleets_placed": self.fleets_placed,
+            "victories": self.victories,
+            "avg_shots_to_victory": self.shots_to_victory / self.victories if self.victories else None,
+            "states": self.states
+        }
+
+    def payload(self) -> bytes:
+        """Serialized snapshot, rebuilt only after a change (fixed size, independent of the number of games)"""
+        if self._payload_version != self.version:
+            self._payload = orjson.dumps(self.snapshot())
+            self._payload_version = self.version
+        return self._payload
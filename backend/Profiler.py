@@ -0,0 +1,174 @@
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+
+class Trace:
+    """Spans of one sampled request"""
+
+    __slots__ = ("root", "stack", "started", "last_lap", "spans")
+
+    def __init__(self, root: str):
+        self.root = root
+        now = time.perf_counter_ns()
+        self.started = now
+        self.last_lap = now
+        # Open frames: [name, start_ns, children_ns]
+        self.stack: List[list] = [[root, now, 0]]
+        # Closed spans: (stack path, total_ns, self_ns)
+        self.spans: List[tuple] = []
+
+    def push(self, name: str):
+        self.stack.append([name, time.perf_counter_ns(), 0])
+
+    def pop(self):
+        name, start, children = self.stack.pop()
+        total = time.perf_counter_ns() - start
+        self.stack[-1][2] += total
+        path = ";".join(frame[0] for frame in self.stack) + ";" + name
+        self.spans.append((path, total, total - children))
+
+    def lap(self, name: str):
+        """Record the time since the previous lap (or the start of the request) as a span"""
+        now = time.perf_counter_ns()
+        total = now - self.last_lap
+        self.last_lap = now
+        self.stack[-1][2] += total
+        path = ";".join(frame[0] for frame in self.stack) + ";" + name
+        self.spans.append((path, total, total))
+
+    def finish(self) -> int:
+        _, start, children = self.stack[0]
+        total = time.perf_counter_ns() - start
+        self.spans.append((self.root, total, total - children))
+        return total
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("naval_profiler_trace", default=None)
+
+
+class _Span:
+    """Context manager that times one stage of a trace"""
+
+    __slots__ = ("trace", "name")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.trace.push(self.name)
+
+    def __exit__(self, *exc):
+        self.trace.pop()
+
+
+# Shared by every span outside a sampled request, so they cost one ContextVar lookup
+_NO_SPAN = nullcontext()
+
+
+def span(name: str):
+    """Time a block as a stage of the current request (no-op when not profiled)"""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+def lap(name: str):
+    """Mark the time spent since the request (or the previous lap) started, e.g. body parsing"""
+    trace = _current.get()
+    if trace is not None:
+        trace.lap(name)
+
+
+class RequestProfiler:
+    """Sampling profiler for requests, configurable at runtime"""
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0, slow_ms: float = 50.0, slow_log_size: int = 200):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.slow_log = deque(maxlen=slow_log_size)
+        self.reset()
+
+    def reset(self):
+        # Collapsed stacks: "root;stage;substage" -> self time in microseconds
+        self.collapsed: Dict[str, int] = {}
+        # Per-stage totals: path -> [count, total_ns]
+        self.stages: Dict[str, list] = {}
+        self.sampled = 0
+        self.slow_log.clear()
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None, slow_ms: Optional[float] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+
+    def should_sample(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def record(self, trace: Trace, total_ns: int):
+        self.sampled += 1
+        for path, total, own in trace.spans:
+            self.collapsed[path] = self.collapsed.get(path, 0) + own // 1000
+            stage = self.stages.get(path)
+            if stage is None:
+                self.stages[path] = [1, total]
+            else:
+                stage[0] += 1
+                stage[1] += total
+
+        total_ms = total_ns / 1e6
+        if total_ms >= self.slow_ms:
+            entry = {
+                "request": trace.root,
+                "total_ms": round(total_ms, 3),
+                "spans": [{"stage": path, "ms": round(total / 1e6, 3)} for path, total, _ in trace.spans[:-1]],
+                "at": time.time(),
+            }
+            self.slow_log.append(entry)
+            print(f"[SLOW] {trace.root} {total_ms:.1f} ms")
+
+    def flamegraph(self) -> str:
+        """Collapsed stack format ("a;b;c microseconds"), for flamegraph.pl or speedscope"""
+        return "\n".join(f"{path} {us}" for path, us in sorted(self.collapsed.items()) if us > 0) + "\n"
+
+    def summary(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "sampled_requests": self.sampled,
+            "stages": {
+                path: {"count": count, "avg_us": round(total / count / 1000, 2)}
+                for path, (count, total) in sorted(self.stages.items())
+            },
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that opens a trace for sampled HTTP requests"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            self.profiler.record(trace, trace.finish())
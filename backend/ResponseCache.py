@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import Callable, Dict, Tuple
+
+import orjson
+
+# Human readable message for each result code
+RESULT_MESSAGES = {
+    "404-failed": "Miss - Water!",
+    "202-shocked": "Hit!",
+    "200-sunken": "Ship Sunk!",
+    "500-sunken": "Last Ship Sunk - You Lose!"
+}
+
+
+@lru_cache(maxsize=1024)
+def attack_response(position: str, result: str) -> Dict:
+    """Response body for an attack. Shared between calls, do not modify"""
+    return {
+        "position": position,
+        "result": result,
+        "hit": "202" in result or "200" in result or "500" in result,
+        "sunk": "200" in result or "500" in result,
+        "game_over": "500" in result,
+        "message": RESULT_MESSAGES.get(result, result)
+    }
+
+
+@lru_cache(maxsize=1024)
+def attack_response_bytes(position: str, result: str) -> bytes:
+    """Serialized attack response, encoded once per position/result pair"""
+    return orjson.dumps(attack_response(position, result))
+
+
+class StatusCache:
+    """Serialized status bodies, rebuilt only when the game version changes"""
+
+    def __init__(self):
+        # game_id -> (fsm, version, body bytes, body text)
+        self.entries: Dict[str, Tuple[object, int, bytes, str]] = {}
+
+    def get(self, game_id: str, fsm, build: Callable[[object], Dict]) -> bytes:
+        """Return the status body of fsm as JSON bytes"""
+        return self._entry(game_id, fsm, build)[2]
+
+    def get_text(self, game_id: str, fsm, build: Callable[[object], Dict]) -> str:
+        """Same as get but decoded, for WebSocket text frames"""
+        return self._entry(game_id, fsm, build)[3]
+
+    def _entry(self, game_id: str, fsm, build: Callable[[object], Dict]):
+        entry = self.entries.get(game_id)
+        if entry is None or entry[0] is not fsm or entry[1] != fsm.version:
+            body = orjson.dumps(build(fsm))
+            entry = (fsm, fsm.version, body, body.decode("utf-8"))
+            self.entries[game_id] = entry
+        return entry
+
+    def discard(self, game_id: str):
+        """Forget the cached body of a game"""
+        self.entries.pop(game_id, None)
@@ -0,0 +1,370 @@
+"""Memory-mapped table of defense games shared between worker processes
+
+Each game is a fixed-size record (board bitmasks, state and counters) in a
+file mapped by every worker. The process that owns a game writes its record
+after every change; any process can read any record straight from the mapping,
+without IPC. Records are guarded by a seqlock: the writer makes the sequence
+number odd while it writes and even again when done, and readers retry until
+they see the same even number before and after reading.
+
+Slots are found by open addressing on crc32(game_id). Claiming or freeing a
+slot takes a file lock (fcntl, not available on Windows, where a single
+writing process is assumed); updating an owned record takes no lock.
+
+Every record stores the pid of its owner. A process only writes or frees the
+records it owns, and cannot claim a game owned by another live process unless
+it takes it over explicitly, so each record keeps a single writer. Before the
+records, a small worker area maps each live pid to the URL it serves on, so a
+worker can send writes for a game to its owner.
+"""
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from DefenseServer import FLEET, GameState, NavalBattleFSM
+
+ROWS = 'ABCDE'
+COLS = '12345'
+CELLS = [f"{row}{col}" for row in ROWS for col in COLS]
+CELL_BIT = {cell: 1 << index for index, cell in enumerate(CELLS)}
+STATES = list(GameState)
+STATE_INDEX = {state: index for index, state in enumerate(STATES)}
+
+FREE, USED, DELETED = 0, 1, 2
+MAX_GAME_ID = 48
+
+# seq, slot status, state, terminated, playing, game_id, owner pid, attack mask, one mask per ship, version, created_at, last_attack_at
+RECORD = struct.Struct(f"<IBBBB{MAX_GAME_ID}sII{len(FLEET)}IIdd")
+SEQ = struct.Struct("<I")
+OWNER = struct.Struct("<I")
+OWNER_OFFSET = 8 + MAX_GAME_ID
+HEADER = struct.Struct("<8sII")  # magic, slots, record size
+WORKER = struct.Struct("<I124s")  # pid, base URL
+WORKER_SLOTS = 64
+RECORDS_OFFSET = HEADER.size + WORKER_SLOTS * WORKER.size
+MAGIC = b"NAVALTB3"
+
+
+def mask_of(positions) -> int:
+    mask = 0
+    for position in positions:
+        mask |= CELL_BIT.get(position, 0)
+    return mask
+
+
+def cells_of(mask: int) -> List[str]:
+    return [cell for cell in CELLS if mask & CELL_BIT[cell]]
+
+
+def process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if pid == 0 or fcntl is None:
+        return False  # free record, or Windows where this process is the only writer
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class GameRecord:
+    """Decoded copy of one record"""
+
+    __slots__ = ("game_id", "state", "terminated", "playing", "attack_mask", "ship_masks", "version", "created_at", "last_attack_at")
+
+    def __init__(self, game_id: str, state: GameState, terminated: bool, playing: bool, attack_mask: int,
+                 ship_masks: tuple, version: int, created_at: float, last_attack_at: float):
+        self.game_id = game_id
+        self.state = state
+        self.terminated = terminated
+        self.playing = playing  # the owner also has an attack game, so it fires back
+        self.attack_mask = attack_mask
+        self.ship_masks = ship_masks
+        self.version = version
+        self.created_at = created_at
+        self.last_attack_at = last_attack_at or None
+
+    def status(self) -> Dict:
+        """Same body as the defense status built from a NavalBattleFSM"""
+        ships_status = []
+        sunk_mask = 0
+        for (_, name, _), ship_mask in zip(FLEET, self.ship_masks):
+            hit_mask = ship_mask & self.attack_mask
+            is_sunk = bool(ship_mask) and hit_mask == ship_mask
+            if is_sunk:
+                sunk_mask |= ship_mask
+            positions = cells_of(ship_mask)
+            hits = cells_of(hit_mask)
+            ships_status.append({
+                "name": name,
+                "positions": positions,
+                "hits": hits,
+                "is_sunk": is_sunk,
+                "hit_count": len(hits),
+                "total_positions": len(positions)
+            })
+
+        fleet_mask = 0
+        for ship_mask in self.ship_masks:
+            fleet_mask |= ship_mask
+        grid = {}
+        for cell, bit in CELL_BIT.items():
+            if not self.attack_mask & bit:
+                grid[cell] = '~'
+            elif sunk_mask & bit:
+                grid[cell] = '#'
+            elif fleet_mask & bit:
+                grid[cell] = 'X'
+            else:
+                grid[cell] = 'O'
+
+        return {
+            "state": self.state.value,
+            "ships_status": ships_status,
+            "total_attacks": bin(self.attack_mask).count("1"),
+            "grid": grid
+        }
+
+
+class SharedGameTable:
+    """Fixed-size records of defense games in a shared memory-mapped file"""
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        size = RECORDS_OFFSET + slots * RECORD.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock_file()
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, size)
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                os.write(self.fd, HEADER.pack(MAGIC, slots, RECORD.size))
+            self.map = mmap.mmap(self.fd, 0)
+        finally:
+            self._unlock_file()
+
+        magic, self.slots, record_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a shared game table of this version")
+        self.pid = os.getpid()
+        # Slot of each game written by this process
+        self.owned: Dict[str, int] = {}
+        # Games of this process whose owner also attacks
+        self.playing: Set[str] = set()
+
+    def _lock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _offset(self, slot: int) -> int:
+        return RECORDS_OFFSET + slot * RECORD.size
+
+    def register_worker(self, url: str) -> bool:
+        """Announce the base URL this process serves on. False if every worker slot is taken"""
+        encoded = url.encode("utf-8")
+        if len(encoded) > WORKER.size - 4:
+            raise ValueError(f"Worker URL too long: {url}")
+        self._lock_file()
+        try:
+            free = None
+            for index in range(WORKER_SLOTS):
+                pid = WORKER.unpack_from(self.map, HEADER.size + index * WORKER.size)[0]
+                if pid == self.pid:
+                    free = index
+                    break
+                if free is None and not process_alive(pid):
+                    free = index  # never used, or left by a dead worker
+            if free is None:
+                return False
+            WORKER.pack_into(self.map, HEADER.size + free * WORKER.size, self.pid, encoded)
+            return True
+        finally:
+            self._unlock_file()
+
+    def worker_url(self, pid: int) -> Optional[str]:
+        """Base URL registered by pid, None if it registered none"""
+        for index in range(WORKER_SLOTS):
+            worker_pid, url = WORKER.unpack_from(self.map, HEADER.size + index * WORKER.size)
+            if worker_pid == pid:
+                return url.rstrip(b"\0").decode("utf-8") or None
+        return None
+
+    def _probe(self, key: bytes):
+        """Slots to try for key, in order"""
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            yield (start + i) % self.slots
+
+    def _find(self, key: bytes) -> Optional[int]:
+        for slot in self._probe(key):
+            offset = self._offset(slot)
+            status = self.map[offset + 4]
+            if status == FREE:
+                return None
+            if status == USED and self.map[offset + 8:offset + 8 + MAX_GAME_ID].rstrip(b"\0") == key:
+                return slot
+        return None
+
+    def _owner(self, slot: int) -> int:
+        return OWNER.unpack_from(self.map, self._offset(slot) + OWNER_OFFSET)[0]
+
+    def _claim(self, key: bytes, fsm: NavalBattleFSM, take_over: bool) -> Optional[int]:
+        """Find or take a slot for key and write fsm into it
+
+        None if the table is full, or if another live process owns key and take_over is false.
+        """
+        self._lock_file()
+        try:
+            slot = self._find(key)
+            if slot is not None:
+                owner = self._owner(slot)
+                if owner != self.pid and process_alive(owner) and not take_over:
+                    return None
+                self._write(slot, USED, key, fsm)
+                return slot
+            for slot in self._probe(key):
+                offset = self._offset(slot)
+                if self.map[offset + 4] != USED:
+                    self._write(slot, USED, key, fsm)
+                    return slot
+            return None  # table full
+        finally:
+            self._unlock_file()
+
+    def _owned_slot(self, game_id: str) -> Optional[int]:
+        """Slot of game_id if this process still owns it"""
+        slot = self.owned.get(game_id)
+        if slot is not None and self._owner(slot) != self.pid:
+            del self.owned[game_id]  # taken over by another process
+            return None
+        return slot
+
+    def owner(self, game_id: str) -> Optional[int]:
+        """Pid of the other live process that owns game_id, None if it is free or ours"""
+        key = game_id.encode("utf-8")
+        if len(key) > MAX_GAME_ID:
+            return None
+        slot = self._find(key)
+        if slot is None:
+            return None
+        pid = self._owner(slot)
+        return pid if pid != self.pid and process_alive(pid) else None
+
+    def _write(self, slot: int, status: int, key: bytes, fsm: Optional[NavalBattleFSM]):
+        offset = self._offset(slot)
+        seq = SEQ.unpack_from(self.map, offset)[0]
+        SEQ.pack_into(self.map, offset, seq + 1)  # odd: write in progress
+        if fsm is None:
+            fields = (status, 0, 0, 0, key, 0, 0) + (0,) * len(FLEET) + (0, 0.0, 0.0)
+        else:
+            ship_masks = tuple(mask_of(ship.positions) for ship in fsm.ships[:len(FLEET)])
+            ship_masks += (0,) * (len(FLEET) - len(ship_masks))
+            fields = (status, STATE_INDEX[fsm.current_state], fsm.terminated, fsm.game_id in self.playing, key, self.pid,
+                      mask_of(fsm.all_attacks)) + ship_masks + (fsm.version, fsm.created_at, fsm.last_attack_at or 0.0)
+        RECORD.pack_into(self.map, offset, seq + 1, *fields)
+        SEQ.pack_into(self.map, offset, seq + 2)
+
+    def publish(self, game_id: str, fsm: NavalBattleFSM, take_over: bool = False) -> bool:
+        """Write the record of a game owned by this process
+
+        False if it does not fit, or if another live process owns the game and take_over is false.
+        """
+        slot = self._owned_slot(game_id)
+        if slot is not None:
+            self._write(slot, USED, game_id.encode("utf-8"), fsm)
+            return True
+        key = game_id.encode("utf-8")
+        if len(key) > MAX_GAME_ID:
+            return False
+        slot = self._claim(key, fsm, take_over)
+        if slot is None:
+            return False
+        self.owned[game_id] = slot
+        return True
+
+    def set_playing(self, game_id: str, fsm: NavalBattleFSM, playing: bool):
+        """Flag whether the owner of a game also attacks, and write the record again"""
+        if playing:
+            self.playing.add(game_id)
+        else:
+            self.playing.discard(game_id)
+        slot = self._owned_slot(game_id)
+        if slot is not None:
+            self._write(slot, USED, game_id.encode("utf-8"), fsm)
+
+    def remove(self, game_id: str):
+        """Free the record of a game, if this process still owns it"""
+        self.playing.discard(game_id)
+        if self.owned.get(game_id) is None:
+            return
+        self._lock_file()
+        try:
+            slot = self._owned_slot(game_id)
+            if slot is None:
+                return
+            del self.owned[game_id]
+            # A tombstone is only needed if a probe chain continues after this slot;
+            # otherwise free it, and the tombstones right before it
+            if self.map[self._offset((slot + 1) % self.slots) + 4] != FREE:
+                self._write(slot, DELETED, b"", None)
+                return
+            self._write(slot, FREE, b"", None)
+            slot = (slot - 1) % self.slots
+            while self.map[self._offset(slot) + 4] == DELETED:
+                self._write(slot, FREE, b"", None)
+                slot = (slot - 1) % self.slots
+        finally:
+            self._unlock_file()
+
+    def read(self, game_id: str, retries: int = 1000) -> Optional[GameRecord]:
+        """Consistent copy of a game's record, written by any process"""
+        key = game_id.encode("utf-8")
+        if len(key) > MAX_GAME_ID:
+            return None
+        slot = self.owned.get(game_id)
+        if slot is None:
+            slot = self._find(key)
+            if slot is None:
+                return None
+
+        offset = self._offset(slot)
+        for _ in range(retries):
+            before = SEQ.unpack_from(self.map, offset)[0]
+            if before & 1:
+                continue
+            fields = RECORD.unpack_from(self.map, offset)
+            if SEQ.unpack_from(self.map, offset)[0] != before:
+                continue
+            _, status, state, terminated, playing, stored_key, _, attack_mask, *rest = fields
+            if status != USED or stored_key.rstrip(b"\0") != key:
+                return None  # freed or reused while we looked it up
+            ship_masks, (version, created_at, last_attack_at) = tuple(rest[:len(FLEET)]), rest[len(FLEET):]
+            return GameRecord(game_id, STATES[state], bool(terminated), bool(playing), attack_mask, ship_masks,
+                              version, created_at, last_attack_at)
+        return None
+
+    def on_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener"""
+        if not fsm.last_attack_recorded:
+            return
+        slot = self._owned_slot(fsm.game_id)
+        if slot is not None:
+            self._write(slot, USED, fsm.game_id.encode("utf-8"), fsm)
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
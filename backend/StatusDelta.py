@@ -0,0 +1,85 @@
+import itertools
+from collections import deque
+from typing import Dict, Optional
+
+from DefenseServer import GameState, NavalBattleFSM
+
+
+class GameLog:
+    """Recent grid changes of one game"""
+
+    __slots__ = ("owner", "epoch", "entries")
+
+    def __init__(self, owner, epoch: int, max_entries: int):
+        self.owner = owner
+        self.epoch = epoch
+        self.entries = deque(maxlen=max_entries)  # (version, {cell: value})
+
+
+class DeltaLog:
+    """Bounded per-game history of changed cells, to answer "what changed since version N"
+
+    Versions are tokens "<epoch>:<version>". The epoch changes when a game id
+    is set up again, so a client holding a token of the old game gets a full
+    snapshot instead of a wrong delta.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.logs: Dict[str, GameLog] = {}
+        self.epochs = itertools.count(1)
+
+    def _log(self, game_id: str, owner) -> GameLog:
+        log = self.logs.get(game_id)
+        if log is None or log.owner is not owner:
+            log = GameLog(owner, next(self.epochs), self.max_entries)
+            self.logs[game_id] = log
+        return log
+
+    def record(self, game_id: str, owner, version: int, cells: Dict[str, str]):
+        """Remember the cells changed by version"""
+        self._log(game_id, owner).entries.append((version, cells))
+
+    def token(self, game_id: str, owner) -> str:
+        return f"{self._log(game_id, owner).epoch}:{owner.version}"
+
+    def changes_since(self, game_id: str, owner, since: Optional[str]) -> Optional[Dict[str, str]]:
+        """Cells changed after since, or None when a full snapshot is needed"""
+        if not since:
+            return None
+        try:
+            epoch, version = (int(part) for part in since.split(":"))
+        except ValueError:
+            return None
+
+        log = self._log(game_id, owner)
+        if epoch != log.epoch or version > owner.version:
+            return None
+        if version == owner.version:
+            return {}
+        # Too far behind: the oldest change we still have is newer than since + 1
+        if not log.entries or log.entries[0][0] > version + 1:
+            return None
+
+        changes = {}
+        for entry_version, cells in log.entries:
+            if entry_version > version:
+                changes.update(cells)
+        return changes
+
+    def forget(self, game_id: str):
+        self.logs.pop(game_id, None)
+
+    def on_shot(self, fsm: NavalBattleFSM, position: str, result: str, previous_state: GameState, elapsed_ns: int):
+        """NavalBattleFSM listener: defense grid cells changed by an attack"""
+        if not fsm.last_attack_recorded:
+            return
+        if result == "404-failed":
+            cells = {position: 'O'}
+        elif result == "202-shocked":
+            cells = {position: 'X'}
+        else:
+            # Sunk: every cell of the ship turns '#'
+            ship = next(ship for ship in fsm.ships if ship.is_position_ship(position))
+            cells = dict.fromkeys(ship.positions, '#')
+        self.record(fsm.game_id, fsm, fsm.version, cells)
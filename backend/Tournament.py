@@ -0,0 +1,324 @@
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from DefenseServer import NavalBattleFSM, random_fleet
+from AttackClient import AttackClientFSM
+
+ROWS = 'ABCDE'
+COLS = '12345'
+ALL_CELLS = [f"{row}{col}" for row in ROWS for col in COLS]
+
+
+##########* Strategies *##############
+
+class TargetingStrategy:
+    """Picks the next cell to attack. Never returns the same cell twice"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.queue = self._order()
+
+    def _order(self) -> List[str]:
+        return list(ALL_CELLS)
+
+    def next_move(self) -> str:
+        return self.queue.pop()
+
+    def record(self, position: str, result: str):
+        """Feedback after each shot, ignored by the basic strategies"""
+        pass
+
+
+class SequentialTargeting(TargetingStrategy):
+    """A1, A2, ... E5"""
+
+    def _order(self) -> List[str]:
+        return list(reversed(ALL_CELLS))
+
+
+class RandomTargeting(TargetingStrategy):
+    """Uniformly random cells"""
+
+    def _order(self) -> List[str]:
+        cells = list(ALL_CELLS)
+        self.rng.shuffle(cells)
+        return cells
+
+
+class ParityTargeting(TargetingStrategy):
+    """Random checkerboard cells first, then the rest"""
+
+    def _order(self) -> List[str]:
+        even = [c for c in ALL_CELLS if (ROWS.index(c[0]) + COLS.index(c[1])) % 2 == 0]
+        odd = [c for c in ALL_CELLS if (ROWS.index(c[0]) + COLS.index(c[1])) % 2 == 1]
+        self.rng.shuffle(even)
+        self.rng.shuffle(odd)
+        # Popped from the end
+        return odd + even
+
+
+class HuntTargetTargeting(TargetingStrategy):
+    """AttackClientFSM hunt/target modes: parity search, then the neighbours of each hit"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.fsm = AttackClientFSM(rng)
+
+    def next_move(self) -> str:
+        position = self.fsm.next_move()
+        if position is None:
+            raise IndexError("no cells left")
+        return position
+
+    def record(self, position: str, result: str):
+        self.fsm.process_attack_result(position, result)
+
+
+def edge_fleet(rng: random.Random) -> Dict[str, List[str]]:
+    """Random placement that only keeps fleets touching the border"""
+    while True:
+        fleet = random_fleet(rng)
+        cells = [c for positions in fleet.values() for c in positions]
+        if all(c[0] in 'AE' or c[1] in '15' for c in cells):
+            return fleet
+
+
+PLACEMENTS: Dict[str, Callable[[random.Random], Dict[str, List[str]]]] = {
+    "random": random_fleet,
+    "edge": edge_fleet,
+}
+
+TARGETING: Dict[str, Callable[[random.Random], TargetingStrategy]] = {
+    "sequential": SequentialTargeting,
+    "random": RandomTargeting,
+    "parity": ParityTargeting,
+    "hunt_target": HuntTargetTargeting,
+}
+
+
+class Competitor(NamedTuple):
+    name: str
+    placement: str  # key in PLACEMENTS
+    targeting: str  # key in TARGETING
+    seed: int = 0
+
+
+def build_roster(size: int, seed: int = 0) -> List[Competitor]:
+    """Roster cycling through every placement/targeting pair with distinct seeds"""
+    combos = [(p, t) for p in PLACEMENTS for t in TARGETING]
+    return [
+        Competitor(f"{combos[i % len(combos)][0]}-{combos[i % len(combos)][1]}-{i}",
+                   combos[i % len(combos)][0], combos[i % len(combos)][1], seed + i)
+        for i in range(size)
+    ]
+
+
+##########* Matches *##############
+
+def play_match(a: Competitor, b: Competitor, seed: int) -> Tuple[int, int, int]:
+    """Play a full game between two competitors
+
+    Returns (winner index 0/1, shots fired by a, shots fired by b).
+    """
+    rng = random.Random(seed)
+    competitors = (a, b)
+    boards = []
+    shooters = []
+    for c in competitors:
+        board = NavalBattleFSM(c.name)
+        board.place_fleet(PLACEMENTS[c.placement](random.Random(c.seed * 1000003 + seed)))
+        boards.append(board)
+        shooters.append(TARGETING[c.targeting](random.Random(rng.random())))
+    trackers = (AttackClientFSM(), AttackClientFSM())
+
+    turn = rng.randrange(2)  # coin toss for the first shot
+    while True:
+        position = shooters[turn].next_move()
+        result = boards[1 - turn].process_attack(position)
+        trackers[turn].process_attack_result(position, result)
+        shooters[turn].record(position, result)
+        if trackers[turn].game_won:
+            return turn, trackers[0].total_attacks, trackers[1].total_attacks
+        turn = 1 - turn
+
+
+# Roster of the current worker process, set once by the pool initializer so
+# that only indexes travel between processes
+_roster: List[Competitor] = []
+
+
+def _init_worker(roster: List[Competitor]):
+    global _roster
+    _roster = roster
+
+
+def _play_chunk(pairings: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int, int, int]]:
+    """Play a batch of (i, j, seed) pairings in a worker"""
+    results = []
+    for i, j, seed in pairings:
+        winner, shots_i, shots_j = play_match(_roster[i], _roster[j], seed)
+        results.append((i, j, winner, shots_i, shots_j))
+    return results
+
+
+##########* Scheduling *##############
+
+def round_robin_pairings(size: int, seed: int = 0) -> Iterator[Tuple[int, int, int]]:
+    """Every competitor against every other one once"""
+    match_seed = seed
+    for i in range(size):
+        for j in range(i + 1, size):
+            match_seed += 1
+            yield i, j, match_seed
+
+
+class Standings:
+    """Running results table"""
+
+    def __init__(self, roster: List[Competitor]):
+        self.roster = roster
+        self.wins = [0] * len(roster)
+        self.losses = [0] * len(roster)
+        self.shots = [0] * len(roster)  # shots fired in won games
+        self.opponents = [set() for _ in roster]
+        self.matches = 0
+
+    def record(self, i: int, j: int, winner: int, shots_i: int, shots_j: int):
+        self.matches += 1
+        self.opponents[i].add(j)
+        self.opponents[j].add(i)
+        if winner == 0:
+            self.wins[i] += 1
+            self.losses[j] += 1
+            self.shots[i] += shots_i
+        else:
+            self.wins[j] += 1
+            self.losses[i] += 1
+            self.shots[j] += shots_j
+
+    def ranking(self) -> List[int]:
+        """Competitor indexes, best first (wins, then fewer shots per win)"""
+        return sorted(
+            range(len(self.roster)),
+            key=lambda k: (-self.wins[k], self.shots[k] / self.wins[k] if self.wins[k] else math.inf)
+        )
+
+    def top(self, n: int = 10) -> List[Dict]:
+        table = []
+        for k in self.ranking()[:n]:
+            table.append({
+                "name": self.roster[k].name,
+                "wins": self.wins[k],
+                "losses": self.losses[k],
+                "avg_shots_to_win": round(self.shots[k] / self.wins[k], 2) if self.wins[k] else None
+            })
+        return table
+
+
+def swiss_pairings(standings: Standings, rng: random.Random) -> List[Tuple[int, int, int]]:
+    """Pair competitors with similar scores that have not met yet"""
+    order = list(range(len(standings.roster)))
+    rng.shuffle(order)
+    order.sort(key=lambda k: -standings.wins[k])
+
+    pairings = []
+    unpaired = order
+    while len(unpaired) > 1:
+        first = unpaired[0]
+        rest = unpaired[1:]
+        # Closest in the table that is not a rematch, otherwise allow one
+        partner = next((k for k in rest if k not in standings.opponents[first]), rest[0])
+        rest.remove(partner)
+        pairings.append((first, partner, rng.getrandbits(32)))
+        unpaired = rest
+    # An odd competitor out gets a bye
+    return pairings
+
+
+class Tournament:
+    """Runs brackets across a process pool and streams the standings"""
+
+    def __init__(self, roster: List[Competitor], workers: Optional[int] = None, chunk_size: int = 2000, seed: int = 0):
+        self.roster = roster
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.standings = Standings(roster)
+
+    def _run(self, executor: ProcessPoolExecutor, pairings, chunk_size: int) -> Iterator[Standings]:
+        """Play pairings in chunks, yielding the standings after each chunk"""
+        futures = []
+        chunk = []
+        for pairing in pairings:
+            chunk.append(pairing)
+            if len(chunk) >= chunk_size:
+                futures.append(executor.submit(_play_chunk, chunk))
+                chunk = []
+        if chunk:
+            futures.append(executor.submit(_play_chunk, chunk))
+
+        for future in as_completed(futures):
+            for result in future.result():
+                self.standings.record(*result)
+            yield self.standings
+
+    def _executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.roster,))
+
+    def round_robin(self) -> Iterator[Standings]:
+        """Everyone plays everyone"""
+        with self._executor() as executor:
+            yield from self._run(executor, round_robin_pairings(len(self.roster), self.seed), self.chunk_size)
+
+    def swiss(self, rounds: Optional[int] = None) -> Iterator[Standings]:
+        """Swiss system: each round pairs competitors with similar scores"""
+        rounds = rounds or max(1, math.ceil(math.log2(max(2, len(self.roster)))))
+        rng = random.Random(self.seed)
+        # Rounds are small, spread each one over all workers
+        chunk_size = max(1, min(self.chunk_size, len(self.roster) // (2 * self.workers)))
+        with self._executor() as executor:
+            for _ in range(rounds):
+                yield from self._run(executor, swiss_pairings(self.standings, rng), chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Naval Battle tournament runner")
+    parser.add_argument("--size", type=int, default=50, help="number of competitors in the generated roster")
+    parser.add_argument("--format", choices=["round-robin", "swiss"], default="round-robin")
+    parser.add_argument("--rounds", type=int, default=None, help="swiss rounds (default log2 of the roster)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="matches per worker task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10, help="rows of the standings to print")
+    args = parser.parse_args()
+
+    roster = build_roster(args.size, args.seed)
+    tournament = Tournament(roster, args.workers, args.chunk_size, args.seed)
+    total = args.size * (args.size - 1) // 2 if args.format == "round-robin" else None
+
+    print(f"🏆 Torneo {args.format}: {args.size} estrategias, {tournament.workers} procesos")
+    started = time.perf_counter()
+    last_print = 0.0
+    standings = tournament.standings
+    stream = tournament.round_robin() if args.format == "round-robin" else tournament.swiss(args.rounds)
+    for standings in stream:
+        now = time.perf_counter()
+        if now - last_print >= 2:
+            last_print = now
+            progress = f"{standings.matches}/{total}" if total else f"{standings.matches}"
+            leader = standings.top(1)[0]
+            print(f"  [{now - started:6.1f}s] partidas {progress} - líder: {leader['name']} ({leader['wins']} victorias)")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n🏁 {standings.matches} partidas en {elapsed:.1f}s ({standings.matches / elapsed:.0f} partidas/s)")
+    for rank, row in enumerate(standings.top(args.top), 1):
+        print(f"  {rank:>3}. {row['name']:<30} {row['wins']:>6} V {row['losses']:>6} D  {row['avg_shots_to_win']} disparos/victoria")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import time
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Token bucket for a single client"""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "last_refill")
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def consume(self, amount: float = 1.0) -> bool:
+        """Take tokens from the bucket. Return true if there were enough"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_refill = now
+
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+class RateLimiter:
+    """Token buckets keyed by game_id / client"""
+
+    def __init__(self, capacity: float = 5, refill_rate: float = 2, max_keys: int = 100000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+
+    def allow(self, key: Hashable) -> bool:
+        """Return true if the client identified by key may fire now"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            # Forget the oldest buckets instead of growing without limit
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.pop(next(iter(self.buckets)))
+            bucket = TokenBucket(self.capacity, self.refill_rate)
+            self.buckets[key] = bucket
+        return bucket.consume()
+
+    def forget(self, key: Hashable):
+        """Drop the bucket for a client"""
+        self.buckets.pop(key, None)
+
+
+class TurnTracker:
+    """Per-player turn token
+
+    A player who fires at an enemy hands the turn over and must wait until a
+    shot lands on their own defense game before firing again.
+    """
+
+    def __init__(self):
+        self.waiting: Dict[str, str] = {}  # attacker id -> enemy game id
+
+    def can_fire(self, attacker_id: Optional[str]) -> bool:
+        """Check if the attacker holds the turn"""
+        if attacker_id is None:
+            return True
+        return attacker_id not in self.waiting
+
+    def fired(self, attacker_id: Optional[str], enemy_game_id: str):
+        """Record a shot from attacker_id (None if unknown) at enemy_game_id"""
+        # Shooting at your own board (local practice) gives the turn straight back
+        if attacker_id is not None and attacker_id != enemy_game_id:
+            self.waiting[attacker_id] = enemy_game_id
+        # The defender now holds the turn
+        self.waiting.pop(enemy_game_id, None)
+
+    def reset(self, player_id: str):
+        """Give the turn back to a player (new game)"""
+        self.waiting.pop(player_id, None)
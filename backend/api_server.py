@@ -1,17 +1,29 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Request
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Callable, Dict, List, Optional
 import asyncio
-import json
-from enum import Enum
-import requests
+import itertools
+import os
 
-from DefenseServer import NavalBattleFSM, GameState, Ship
-from AttackClient import AttackClientFSM, AttackBoard
+import orjson
 
-app = FastAPI(title="Naval Battle API", version="1.0.0")
+# Only the game engines are needed on the request path; the interactive CLIs
+# in these modules are never called and `requests` is imported lazily there
+from DefenseServer import NavalBattleFSM, GameState, Ship
+from AttackClient import AttackClientFSM
+from TurnControl import RateLimiter, TurnTracker
+from ResponseCache import attack_response, attack_response_bytes, StatusCache
+from BroadcastHub import BroadcastHub
+from GlobalStats import GlobalStats
+from StatusDelta import DeltaLog
+from GameIndex import GameIndex
+from Checkpoint import snapshot_defense, restore_defense
+from Profiler import RequestProfiler, ProfilingMiddleware, span, lap
+
+app = FastAPI(title="Naval Battle API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend integration
 app.add_middleware(
@@ -22,6 +34,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling, switchable at runtime through /api/admin/profiling
+profiler = RequestProfiler(
+    enabled=os.environ.get("NAVAL_PROFILING") == "1",
+    sample_rate=float(os.environ.get("NAVAL_PROFILING_SAMPLE_RATE", "1.0")),
+    slow_ms=float(os.environ.get("NAVAL_PROFILING_SLOW_MS", "50")),
+)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 # Pydantic models for API requests/responses
 class FleetSetup(BaseModel):
     battleship: List[str]
@@ -32,6 +52,10 @@ class FleetSetup(BaseModel):
 class AttackRequest(BaseModel):
     position: str
 
+class AutoAttackRequest(BaseModel):
+    enemy_game_id: str
+    game_id: str = "default"
+
 class AttackResponse(BaseModel):
     position: str
     result: str
@@ -46,6 +70,36 @@ class GameStatus(BaseModel):
     total_attacks: int
     grid: Dict[str, str]
 
+class ProfilingConfig(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = None
+    slow_ms: Optional[float] = None
+
+class BulkGamesRequest(BaseModel):
+    action: str  # terminate, evict, export or migrate
+    game_ids: Optional[List[str]] = None  # explicit games, otherwise the filters below
+    state: Optional[str] = None
+    idle_for: Optional[float] = None
+    older_than: Optional[float] = None
+    limit: int = Field(1000, ge=1)
+    target: Optional[str] = None  # base URL of the API receiving migrated games
+
+class ShipSnapshot(BaseModel):
+    name: str
+    positions: List[str]
+    hits: List[str]
+
+class DefenseSnapshot(BaseModel):
+    """A defense game as written by Checkpoint.snapshot_defense"""
+    game_id: str
+    state: GameState
+    ships: List[ShipSnapshot]
+    attacks: List[str]
+    version: int
+    created_at: float
+    last_attack_at: Optional[float] = None
+    terminated: bool = False
+
 class AttackStatus(BaseModel):
     total_attacks: int
     hits: int
@@ -59,46 +113,233 @@ class AttackStatus(BaseModel):
 defense_games: Dict[str, NavalBattleFSM] = {}
 attack_games: Dict[str, AttackClientFSM] = {}
 
+# Turn order and flood protection for the attack path
+attack_limiter = RateLimiter(capacity=5, refill_rate=2)
+turns = TurnTracker()
+rejected_requests: Dict[str, int] = {"rate_limited": 0, "out_of_turn": 0}
+
+# Aggregates across all defense games, served by /api/stats
+global_stats = GlobalStats()
+
+# Recent grid changes per game, served by the /status/delta endpoints
+defense_deltas = DeltaLog()
+attack_deltas = DeltaLog()
+
+# State, age and activity indexes for the admin API
+game_index = GameIndex()
+
+# Called after every attack on any defense game, see NavalBattleFSM.listeners
+defense_listeners: List[Callable] = [global_stats.record_shot, defense_deltas.on_shot, game_index.on_shot]
+
+# Optional analytics export: NAVAL_EXPORT_DIR=<dir> [NAVAL_EXPORT_FORMAT=csv|parquet|arrow]
+exporter = None
+if os.environ.get("NAVAL_EXPORT_DIR"):
+    from AnalyticsExport import GameExporter
+    exporter = GameExporter(os.environ["NAVAL_EXPORT_DIR"], os.environ.get("NAVAL_EXPORT_FORMAT", "csv"))
+    defense_listeners.append(exporter.record_shot)
+
+# Optional crash-safe checkpoints: NAVAL_CHECKPOINT_DIR=<dir> [NAVAL_CHECKPOINT_INTERVAL=seconds]
+checkpointer = None
+if os.environ.get("NAVAL_CHECKPOINT_DIR"):
+    from Checkpoint import Checkpointer
+    checkpointer = Checkpointer(os.environ["NAVAL_CHECKPOINT_DIR"], float(os.environ.get("NAVAL_CHECKPOINT_INTERVAL", "1.0")))
+    defense_listeners.append(checkpointer.on_shot)
+
+# Optional table shared by the workers of one host: NAVAL_SHARED_TABLE=<file> [NAVAL_SHARED_TABLE_SLOTS=n]
+# [NAVAL_WORKER_URL=<base URL of this worker>]. Each worker publishes the games it owns; status reads for games
+# owned by another worker come from the table, setups and shots for them are sent to the owner's URL
+shared_table = None
+if os.environ.get("NAVAL_SHARED_TABLE"):
+    from SharedTable import SharedGameTable
+    shared_table = SharedGameTable(os.environ["NAVAL_SHARED_TABLE"], int(os.environ.get("NAVAL_SHARED_TABLE_SLOTS", "65536")))
+    defense_listeners.append(shared_table.on_shot)
+    if os.environ.get("NAVAL_WORKER_URL") and not shared_table.register_worker(os.environ["NAVAL_WORKER_URL"].rstrip("/")):
+        print("[SHARED] No quedan huecos de worker en la tabla, las escrituras de otros workers recibirán 421")
+
+# Status bodies of games owned by other workers: game_id -> (version token, body bytes, body text)
+remote_status_cache: Dict[str, tuple] = {}
+
+
+def check_owner(game_id: str):
+    """Writes must reach the worker that owns the game, see the shared table in the README"""
+    owner = shared_table.owner(game_id) if shared_table is not None else None
+    if owner is not None:
+        raise HTTPException(status_code=421, detail=f"Game {game_id} is owned by worker {owner}, route its requests there")
+
+
+def owner_url(game_id: str) -> Optional[str]:
+    """Base URL of the other worker that owns game_id, None if nobody else owns it or its worker has no URL"""
+    owner = shared_table.owner(game_id) if shared_table is not None else None
+    return shared_table.worker_url(owner) if owner is not None else None
+
+
+def post_to_worker(url: str, path: str, params: Dict, body: Dict) -> tuple:
+    """POST a JSON body to another worker (runs in a worker thread). Returns (status code, body)"""
+    import requests
+
+    response = requests.post(f"{url}{path}", params=params, data=orjson.dumps(body),
+                             headers={"Content-Type": "application/json"}, timeout=10)
+    return response.status_code, response.content
+
+
+async def forward_to_owner(game_id: str, path: str, params: Dict, body: Dict) -> Optional[Response]:
+    """Send a write for game_id to the worker that owns it, None if that is not another worker with a URL"""
+    url = owner_url(game_id)
+    if url is None:
+        return None
+    try:
+        status_code, content = await asyncio.to_thread(post_to_worker, url, path, params, body)
+    except OSError as e:  # requests errors are OSErrors
+        raise HTTPException(status_code=502, detail=f"Worker {url} unreachable: {e}")
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def check_route(route_game_id: Optional[str], game_id: str):
+    """The game_id query parameter of a request with a body only routes it (see the shared table in the README)"""
+    if route_game_id is not None and route_game_id != game_id:
+        raise HTTPException(status_code=422, detail=f"game_id {route_game_id} in the query does not match {game_id} in the body")
+
+
+def remote_status(game_id: str) -> Optional[tuple]:
+    """Status of a game owned by another worker, serialized again only when its record changes"""
+    record = shared_table.read(game_id) if shared_table is not None else None
+    if record is None:
+        remote_status_cache.pop(game_id, None)
+        return None
+    # Version tokens of remote games never parse as DeltaLog tokens, so they always get a full snapshot locally
+    version = f"r{int(record.created_at * 1000)}:{record.version}"
+    entry = remote_status_cache.get(game_id)
+    if entry is None or entry[0] != version:
+        body = orjson.dumps(record.status())
+        entry = (version, body, body.decode("utf-8"))
+        remote_status_cache[game_id] = entry
+    return entry
+
+
+def register_defense_game(game_id: str, fsm: NavalBattleFSM):
+    """Add (or replace) a defense game and attach the global listeners"""
+    fsm.listeners.extend(defense_listeners)
+    if game_id in defense_games:
+        global_stats.remove_game(defense_games[game_id])
+    defense_games[game_id] = fsm
+    global_stats.add_game(fsm)
+    game_index.add(game_id, fsm)
+    if shared_table is not None:
+        if not shared_table.publish(game_id, fsm):
+            print(f"[SHARED] {game_id} no se publicó en la tabla compartida (tabla llena, id largo u otro worker)")
+        elif game_id in attack_games:
+            shared_table.set_playing(game_id, fsm, True)
+
+
+@app.on_event("startup")
+async def restore_checkpoint():
+    if checkpointer is not None:
+        restored = checkpointer.restore(register_defense_game, attack_games.__setitem__)
+        print(f"[CHECKPOINT] {restored} juegos restaurados")
+        checkpointer.start(defense_games, attack_games)
+
+@app.on_event("shutdown")
+async def close_exporter():
+    if exporter is not None:
+        exporter.close()
+    if checkpointer is not None:
+        await checkpointer.stop(defense_games, attack_games)
+    if shared_table is not None:
+        for game_id in list(shared_table.owned):
+            shared_table.remove(game_id)
+        shared_table.close()
+
+# Status bodies serialized once per state change
+defense_status_cache = StatusCache()
+attack_status_cache = StatusCache()
+
+
+def check_attack_allowed(key: tuple, attacker_id: Optional[str]):
+    """Reject floods and out-of-turn shots before the FSM is touched"""
+    if not attack_limiter.allow(key):
+        rejected_requests["rate_limited"] += 1
+        raise HTTPException(status_code=429, detail="Too many attacks, slow down")
+    if not turns.can_fire(attacker_id):
+        rejected_requests["out_of_turn"] += 1
+        raise HTTPException(status_code=409, detail="Not your turn")
+
+def turn_player(game_id: str, enemy_game_id: Optional[str]) -> Optional[str]:
+    """Attacker id whose turns are enforced, None when the enemy could never hand the turn back
+
+    That needs our defense board (to be shot at) and the enemy's attack game (to shoot) on this server.
+    """
+    if game_id in defense_games and plays(enemy_game_id):
+        return game_id
+    return None
+
+def plays(game_id: str) -> bool:
+    """Whether the owner of a defense game also attacks, so it can hand the turn back"""
+    if game_id in attack_games:
+        return True
+    if game_id in defense_games or shared_table is None:
+        return False
+    record = shared_table.read(game_id)
+    return record is not None and record.playing
+
+def has_board(game_id: str) -> bool:
+    """Whether game_id has a defense game here or on another worker"""
+    return game_id in defense_games or (shared_table is not None and shared_table.read(game_id) is not None)
+
+def defense_attacker(game_id: str, attacker_id: Optional[str]) -> Optional[str]:
+    """attacker_id of a shot at game_id, required once game_id's owner plays from this server
+
+    Otherwise leaving it out, or naming a player with no board here, would skip the turn order.
+    """
+    if game_id not in attack_games:
+        return attacker_id
+    if attacker_id is None:
+        raise HTTPException(status_code=422, detail=f"attacker_id is required to attack {game_id}")
+    if not has_board(attacker_id):
+        raise HTTPException(status_code=409, detail=f"Unknown attacker {attacker_id}, set up its defense game first")
+    return attacker_id
+
 
 
 
 
 ##########* Game Handles *##############
 
-def handle_attack(attack: AttackRequest, game_id: str):
+def local_defense_game(game_id: str) -> NavalBattleFSM:
+    """Defense game held by this worker, 421 if another worker owns it and 404 if nobody does"""
     if game_id not in defense_games:
+        check_owner(game_id)
         print(f"[ERROR] Game {game_id} not found. Available games: {list(defense_games.keys())}")
         raise HTTPException(status_code=404, detail=f"Game {game_id} not found")
+    return defense_games[game_id]
+
+def handle_attack(attack: AttackRequest, game_id: str):
+    fsm = local_defense_game(game_id)
     """SEGUNDA CORRECCION (2)"""
 
-
-    fsm = defense_games[game_id]
-    result = fsm.process_attack(attack.position)
-    
-    # Parse result
-    hit = "202" in result or "200" in result or "500" in result
-    sunk = "200" in result or "500" in result
-    game_over = "500" in result
-    
-    messages = {
-        "404-failed": "Miss - Water!",
-        "202-shocked": "Hit!",
-        "200-sunken": "Ship Sunk!",
-        "500-sunken": "Last Ship Sunk - You Lose!"
-    }
-    
-    response = AttackResponse(
-        position=attack.position,
-        result=result,
-        hit=hit,
-        sunk=sunk,
-        game_over=game_over,
-        message=messages.get(result, result)
-    )
+    with span("process_attack"):
+        result = fsm.process_attack(attack.position)
 
     """Tercera correccion (3)"""
-    print(f"[ATTACK] Respuesta: {response}")
-    return response
+    with span("print"):
+        print(f"[ATTACK] Respuesta: {attack.position} -> {result}")
+    return result
+
+async def fire(position: str, enemy_game_id: str, player: Optional[str]) -> str:
+    """Shoot at a defense game of this worker, or through /api/defense/attack of the worker that owns it"""
+    if enemy_game_id not in defense_games:
+        params = {"game_id": enemy_game_id}
+        if player is not None:
+            params["attacker_id"] = player  # the owner keeps the turn order too
+        response = await forward_to_owner(enemy_game_id, "/api/defense/attack", params, {"position": position})
+        if response is not None:
+            try:
+                data = orjson.loads(response.body)
+            except orjson.JSONDecodeError:
+                data = {"detail": response.body.decode("utf-8", errors="replace")}
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=data.get("detail"))
+            return data["result"]
+    return handle_attack(AttackRequest(position=position), enemy_game_id)
 
 
 
@@ -107,12 +348,17 @@ def handle_attack(attack: AttackRequest, game_id: str):
 
 # Defense API endpoints
 @app.post("/api/defense/setup")
-async def setup_defense_fleet(fleet: FleetSetup):
+async def setup_defense_fleet(fleet: FleetSetup, game_id: Optional[str] = None):
+    check_route(game_id, fleet.game_id)
     game_id = fleet.game_id
     print(f"[SETUP] Recibido fleet setup para game_id = {game_id}")
     """Setup defense fleet"""
+    forwarded = await forward_to_owner(game_id, "/api/defense/setup", {}, fleet.model_dump())
+    if forwarded is not None:
+        return forwarded
+    check_owner(game_id)
     try:
-        fsm = NavalBattleFSM()
+        fsm = NavalBattleFSM(game_id)
         
         # Validate positions
         all_positions = fleet.battleship + fleet.submarine + fleet.destroyer
@@ -126,7 +372,10 @@ async def setup_defense_fleet(fleet: FleetSetup):
             Ship("Destroyer", fleet.destroyer)
         ]
         fsm.current_state = GameState.FLEET_INTACT
-        defense_games[game_id] = fsm
+        register_defense_game(game_id, fsm)
+        if checkpointer is not None:
+            checkpointer.mark("defense", game_id)
+        turns.reset(game_id)
         print(f"[SETUP] Defensa registrada para game_id = {game_id}")
         return {"message": "Fleet setup successful", "game_id": game_id}
     except Exception as e:
@@ -134,26 +383,39 @@ async def setup_defense_fleet(fleet: FleetSetup):
 
 
 @app.post("/api/defense/attack", response_model=AttackResponse)
-async def receive_attack(attack: AttackRequest, game_id: str):
-    print("✅ Endpoint /api/attack/send fue llamado correctamente")
+async def receive_attack(attack: AttackRequest, game_id: str, request: Request, attacker_id: Optional[str] = None):
     """Process incoming attack: ESTO SE ACABA DE CORREGIR (1)"""
-    print(f"[ATTACK] Recibido ataque en posición {attack.position} para game_id = {game_id}")
-    result = handle_attack(attack, game_id)
-
-    return result
+    lap("routing_and_parsing")
+    client = request.client.host if request.client else "unknown"
+    if game_id not in defense_games:
+        params = {"game_id": game_id} if attacker_id is None else {"game_id": game_id, "attacker_id": attacker_id}
+        forwarded = await forward_to_owner(game_id, "/api/defense/attack", params, {"position": attack.position})
+        if forwarded is not None:
+            return forwarded
+    with span("limits"):
+        attacker_id = defense_attacker(game_id, attacker_id)
+        check_attack_allowed(("defense", game_id, client), attacker_id)
+
+    with span("print"):
+        print("✅ Endpoint /api/attack/send fue llamado correctamente")
+        print(f"[ATTACK] Recibido ataque en posición {attack.position} para game_id = {game_id}")
+    with span("handle_attack"):
+        result = handle_attack(attack, game_id)
+    turns.fired(attacker_id, game_id)
+
+    with span("serialize"):
+        body = attack_response_bytes(attack.position, result)
+    return Response(content=body, media_type="application/json")
 
     
     
 
-@app.get("/api/defense/status")
-#@app.get("/api/defense/status", response_model=GameStatus) ESO SE QUITO
-async def get_defense_status(game_id: str = "default"):
-    """Get current defense game status"""
-    if game_id not in defense_games:
-        raise HTTPException(status_code=404, detail="Game not found")
-    
-    fsm = defense_games[game_id]
-    
+def build_defense_status(fsm: NavalBattleFSM) -> Dict:
+    """Build the defense status body (GameStatus) of a game"""
+    with span("build_grid"):
+        return _build_defense_status(fsm)
+
+def build_ships_status(fsm: NavalBattleFSM) -> List[Dict]:
     ships_status = []
     for ship in fsm.ships:
         ships_status.append({
@@ -164,6 +426,10 @@ async def get_defense_status(game_id: str = "default"):
             "hit_count": len(ship.hits),
             "total_positions": len(ship.positions)
         })
+    return ships_status
+
+def _build_defense_status(fsm: NavalBattleFSM) -> Dict:
+    ships_status = build_ships_status(fsm)
     
     # Create grid representation
     grid = {}
@@ -181,12 +447,27 @@ async def get_defense_status(game_id: str = "default"):
             else:
                 grid[pos] = '~'
     
-    return GameStatus(
-        state=fsm.current_state.value,
-        ships_status=ships_status,
-        total_attacks=len(fsm.all_attacks),
-        grid=grid
-    )
+    return {
+        "state": fsm.current_state.value,
+        "ships_status": ships_status,
+        "total_attacks": len(fsm.all_attacks),
+        "grid": grid
+    }
+
+@app.get("/api/defense/status")
+#@app.get("/api/defense/status", response_model=GameStatus) ESO SE QUITO
+async def get_defense_status(game_id: str = "default"):
+    """Get current defense game status"""
+    if game_id not in defense_games:
+        entry = remote_status(game_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        return Response(content=entry[1], media_type="application/json")
+
+    lap("routing_and_parsing")
+    with span("status"):
+        body = defense_status_cache.get(game_id, defense_games[game_id], build_defense_status)
+    return Response(content=body, media_type="application/json")
 
 # Attack API endpoints
 @app.post("/api/attack/init")
@@ -194,7 +475,13 @@ async def init_attack_game(request : Request):
     """Initialize attack game"""
     data = await request.json()
     game_id = data.get("game_id", "default")
+    check_route(request.query_params.get("game_id"), game_id)
     attack_games[game_id] = AttackClientFSM()
+    if shared_table is not None and game_id in defense_games:
+        shared_table.set_playing(game_id, defense_games[game_id], True)
+    if checkpointer is not None:
+        checkpointer.mark("attack", game_id)
+    turns.reset(game_id)
     return {"message": "Attack game initialized", "game_id": game_id}
 
 @app.post("/api/attack/send")
@@ -208,6 +495,11 @@ async def send_attack(request: Request):
     enemy_port = int(data.get("enemy_port"))
     enemy_game_id = data.get("enemy_game_id") #correccion para recibir el game id enemigo
     game_id = data.get("game_id", "default") #game id del atacante
+    check_route(request.query_params.get("game_id"), game_id)
+
+    client = request.client.host if request.client else "unknown"
+    player = turn_player(game_id, enemy_game_id)
+    check_attack_allowed(("attack", game_id, client), player)
 
     #se agrega este mensaje
     print(f"[ATTACK] Atacando posición {position} en {enemy_host}:{enemy_port} con enemy_game_id={enemy_game_id}")
@@ -228,19 +520,17 @@ async def send_attack(request: Request):
     #nuevo envio de ataque usando request directamente
     try:
 
-        attack = AttackRequest(position=position)
-    
         print(f"[DEBUG] Ejecutando Ataque")
     
-        response = handle_attack(attack, enemy_game_id)
+        result_code = await fire(position, enemy_game_id, player)
+        turns.fired(player, enemy_game_id)
+        response = attack_response(position, result_code)
 
         print(f"[DEBUG] Status del Ataque: {response}")
 
         if response:
-            result_code = response.result
-
             # Process result in our FSM
-            fsm.process_attack_result(position, response.result)
+            record_attack_result(game_id, fsm, position, result_code)
 
             print(f"ATAQUE REGISTRADO: {position} → {result_code}")
             return {
@@ -254,20 +544,70 @@ async def send_attack(request: Request):
             print(f"[ERROR] {error_msg}")
             raise HTTPException(status_code=500, detail=error_msg)
     
-    except requests.exceptions.ConnectionError as e:
-        error_msg = f"Connection error: Could not connect to {enemy_host}:{enemy_port}"
-        print(f"[ERROR] {error_msg}")
-        raise HTTPException(status_code=500, detail=error_msg)
-    except requests.exceptions.Timeout as e:
-        error_msg = f"Timeout error: Server {enemy_host}:{enemy_port} did not respond"
-        print(f"[ERROR] {error_msg}")
-        raise HTTPException(status_code=500, detail=error_msg)
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = f"Unexpected error: {str(e)}"
         print(f"[ERROR] {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
     
 
+def record_attack_result(game_id: str, fsm: AttackClientFSM, position: str, result_code: str):
+    """Apply a result to the attacker's board and publish the change"""
+    fsm.process_attack_result(position, result_code)
+    attack_deltas.record(game_id, fsm, fsm.version, {position: fsm.attack_board.grid[position]})
+    if checkpointer is not None:
+        checkpointer.mark("attack", game_id)
+
+@app.post("/api/attack/auto")
+async def auto_attack(auto: AutoAttackRequest, request: Request, game_id: Optional[str] = None):
+    """Fire the next shot chosen by the hunt/target strategy of the attack game"""
+    check_route(game_id, auto.game_id)
+    client = request.client.host if request.client else "unknown"
+    player = turn_player(auto.game_id, auto.enemy_game_id)
+    check_attack_allowed(("attack", auto.game_id, client), player)
+
+    if auto.game_id not in attack_games:
+        raise HTTPException(status_code=404, detail="Attack game not found")
+
+    fsm = attack_games[auto.game_id]
+    # next_move takes the cell off the queues, so check what can be checked before it
+    if auto.enemy_game_id not in defense_games and owner_url(auto.enemy_game_id) is None:
+        local_defense_game(auto.enemy_game_id)
+    position = fsm.next_move()
+    if position is None:
+        raise HTTPException(status_code=409, detail="No moves left")
+
+    try:
+        result_code = await fire(position, auto.enemy_game_id, player)
+    except HTTPException:
+        fsm.push_back(position)  # e.g. the owner worker refused or could not be reached
+        raise
+    turns.fired(player, auto.enemy_game_id)
+    record_attack_result(auto.game_id, fsm, position, result_code)
+    print(f"[AUTO] {auto.game_id}: {position} → {result_code} ({fsm.mode.value})")
+    return {
+        "position": position,
+        "response": result_code,
+        "result_data": attack_response(position, result_code),
+        "game_won": fsm.game_won,
+        "mode": fsm.mode.value
+    }
+
+def build_attack_status(fsm: AttackClientFSM) -> Dict:
+    """Build the attack status body (AttackStatus) of a game"""
+    accuracy = (fsm.hits / fsm.total_attacks * 100) if fsm.total_attacks > 0 else 0
+    return {
+        "total_attacks": fsm.total_attacks,
+        "hits": fsm.hits,
+        "misses": fsm.misses,
+        "sunk_ships": fsm.sunk_ships,
+        "accuracy": accuracy,
+        "game_won": fsm.game_won,
+        "mode": fsm.mode.value,
+        "grid": fsm.attack_board.grid
+    }
+
 @app.get("/api/attack/status")
 #@app.get("/api/attack/status", response_model=AttackStatus) esto se cambio
 async def get_attack_status(game_id: str = "default"):
@@ -275,20 +615,236 @@ async def get_attack_status(game_id: str = "default"):
     if game_id not in attack_games:
         raise HTTPException(status_code=404, detail="Attack game not found")
     
-    print(attack_games, game_id)
-    fsm = attack_games[game_id]
-    print('XDXD', fsm)
-    accuracy = (fsm.hits / fsm.total_attacks * 100) if fsm.total_attacks > 0 else 0
-    
-    return AttackStatus(
-        total_attacks=fsm.total_attacks,
-        hits=fsm.hits,
-        misses=fsm.misses,
-        sunk_ships=fsm.sunk_ships,
-        accuracy=accuracy,
-        game_won=fsm.game_won,
-        grid=fsm.attack_board.grid
-    )
+    body = attack_status_cache.get(game_id, attack_games[game_id], build_attack_status)
+    return Response(content=body, media_type="application/json")
+
+def status_delta(deltas: DeltaLog, cache: StatusCache, game_id: str, fsm, build: Callable, summary: Callable, since: Optional[str]) -> Response:
+    """Changes since the version the client last saw, or the full status when it is too far behind"""
+    version = deltas.token(game_id, fsm)
+    changes = deltas.changes_since(game_id, fsm, since)
+    if changes is None:
+        # Reuse the cached full body instead of serializing the grid again
+        body = b'{"full":true,"version":"%s","status":%s}' % (version.encode(), cache.get(game_id, fsm, build))
+    else:
+        body = orjson.dumps({"full": False, "version": version, "changes": {**summary(fsm, changes), "grid": changes}})
+    return Response(content=body, media_type="application/json")
+
+def defense_summary(fsm: NavalBattleFSM, changes: Dict[str, str]) -> Dict:
+    summary = {"state": fsm.current_state.value, "total_attacks": len(fsm.all_attacks)}
+    if changes:
+        summary["ships_status"] = build_ships_status(fsm)
+    return summary
+
+def attack_summary(fsm: AttackClientFSM, changes: Dict[str, str]) -> Dict:
+    status = build_attack_status(fsm)
+    del status["grid"]
+    return status
+
+@app.get("/api/defense/status/delta")
+async def get_defense_status_delta(game_id: str = "default", since: Optional[str] = None):
+    """Defense status as changes since the version token `since`"""
+    if game_id not in defense_games:
+        entry = remote_status(game_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        # Remote games have no change log: nothing when up to date, otherwise a full snapshot
+        version, body, _ = entry
+        if since == version:
+            content = orjson.dumps({"full": False, "version": version, "changes": {"grid": {}}})
+        else:
+            content = b'{"full":true,"version":"%s","status":%s}' % (version.encode(), body)
+        return Response(content=content, media_type="application/json")
+    return status_delta(defense_deltas, defense_status_cache, game_id, defense_games[game_id], build_defense_status, defense_summary, since)
+
+@app.get("/api/attack/status/delta")
+async def get_attack_status_delta(game_id: str = "default", since: Optional[str] = None):
+    """Attack status as changes since the version token `since`"""
+    if game_id not in attack_games:
+        raise HTTPException(status_code=404, detail="Attack game not found")
+    return status_delta(attack_deltas, attack_status_cache, game_id, attack_games[game_id], build_attack_status, attack_summary, since)
+@app.get("/api/stats")
+async def get_global_stats():
+    """Heatmap, placement frequency, shots to victory and state distribution over all games"""
+    return Response(content=global_stats.payload(), media_type="application/json")
+
+@app.get("/api/admin/profiling")
+async def get_profiling():
+    """Profiler settings and average time per stage"""
+    return profiler.summary()
+
+@app.post("/api/admin/profiling")
+async def configure_profiling(config: ProfilingConfig):
+    """Switch profiling on/off or change sampling and the slow-request threshold"""
+    profiler.configure(config.enabled, config.sample_rate, config.slow_ms)
+    return profiler.summary()
+
+@app.delete("/api/admin/profiling")
+async def reset_profiling():
+    """Drop the collected samples"""
+    profiler.reset()
+    return profiler.summary()
+
+@app.get("/api/admin/profiling/flamegraph", response_class=PlainTextResponse)
+async def profiling_flamegraph():
+    """Collapsed stacks (flamegraph.pl / speedscope)"""
+    return profiler.flamegraph()
+
+@app.get("/api/admin/profiling/slow")
+async def profiling_slow_requests():
+    """Requests slower than slow_ms, most recent last"""
+    return list(profiler.slow_log)
+
+# Admin API for live games
+def parse_state(value: str) -> GameState:
+    """GameState from its value (q2) or name (HIT)"""
+    try:
+        return GameState(value)
+    except ValueError:
+        pass
+    try:
+        return GameState[value.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown state {value}")
+
+def game_summary(game_id: str, fsm: NavalBattleFSM) -> Dict:
+    return {
+        "game_id": game_id,
+        "state": fsm.current_state.value,
+        "created_at": fsm.created_at,
+        "last_attack_at": fsm.last_attack_at,
+        "total_attacks": len(fsm.all_attacks),
+        "terminated": fsm.terminated
+    }
+
+def terminate_defense_game(game_id: str):
+    fsm = defense_games[game_id]
+    previous_state = fsm.current_state
+    fsm.terminate()
+    # No cell changes, but delta clients must see the new state and version
+    defense_deltas.record(game_id, fsm, fsm.version, {})
+    if previous_state is not fsm.current_state:
+        global_stats.move_state(previous_state, fsm)
+        game_index.move(game_id, fsm.current_state)
+        if exporter is not None:
+            exporter.record_game(fsm, "terminated")
+    if shared_table is not None:
+        shared_table.publish(game_id, fsm)
+    if checkpointer is not None:
+        checkpointer.mark("defense", game_id)
+
+def evict_defense_game(game_id: str, outcome: Optional[str] = "evicted") -> NavalBattleFSM:
+    """Drop a game from this server and from every structure that refers to it
+
+    An unfinished game gets its export row with outcome, unless it is None (the game lives on elsewhere).
+    """
+    fsm = defense_games.pop(game_id)
+    if exporter is not None and outcome is not None and not fsm.is_game_over():
+        exporter.record_game(fsm, outcome)
+    global_stats.remove_game(fsm)
+    game_index.remove(game_id)
+    defense_status_cache.discard(game_id)
+    defense_deltas.forget(game_id)
+    if shared_table is not None:
+        shared_table.remove(game_id)
+    if checkpointer is not None:
+        checkpointer.mark_removed("defense", game_id)
+    return fsm
+
+def post_games(target: str, snapshots: List[Dict]):
+    """Send snapshots to the import endpoint of another API (runs in a worker thread)"""
+    import requests
+
+    response = requests.post(f"{target.rstrip('/')}/api/admin/games/import", data=orjson.dumps(snapshots),
+                             headers={"Content-Type": "application/json"}, timeout=30)
+    response.raise_for_status()
+
+def parse_cursor(cursor: str) -> tuple:
+    """(time, game_id) from a next_cursor of the form <time>:<game_id>"""
+    timestamp, separator, game_id = cursor.partition(":")
+    try:
+        if separator:
+            return float(timestamp), game_id
+    except ValueError:
+        pass
+    raise HTTPException(status_code=422, detail=f"Invalid cursor {cursor}")
+
+@app.get("/api/admin/games")
+async def list_games(state: Optional[str] = None, idle_for: Optional[float] = None, older_than: Optional[float] = None,
+                     limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """One page of defense games, filtered by state, idle seconds and age in seconds
+
+    cursor is the next_cursor of the previous page: the page starts right after that game in the
+    index order, so games that change or go away between pages do not shift the others.
+    """
+    matches = game_index.query(parse_state(state) if state else None, idle_for, older_than,
+                               after=parse_cursor(cursor) if cursor else None)
+    page = list(itertools.islice(matches, limit + 1))
+    next_cursor = None
+    if len(page) > limit:
+        timestamp, game_id = page[limit - 1]
+        next_cursor = f"{timestamp!r}:{game_id}"
+    return {
+        "total": len(game_index),
+        "counts": game_index.counts(),
+        "games": [game_summary(game_id, defense_games[game_id]) for _, game_id in page[:limit]],
+        "next_cursor": next_cursor
+    }
+
+@app.post("/api/admin/games/bulk")
+async def bulk_games(bulk: BulkGamesRequest):
+    """Terminate, evict, export or migrate a set of defense games"""
+    if bulk.action not in ("terminate", "evict", "export", "migrate"):
+        raise HTTPException(status_code=400, detail=f"Unknown action {bulk.action}")
+    if bulk.action == "migrate" and not bulk.target:
+        raise HTTPException(status_code=400, detail="migrate needs a target")
+
+    if bulk.game_ids is not None:
+        game_ids = [game_id for game_id in bulk.game_ids if game_id in defense_games]
+    else:
+        matches = game_index.query(parse_state(bulk.state) if bulk.state else None, bulk.idle_for, bulk.older_than)
+        game_ids = [game_id for _, game_id in itertools.islice(matches, bulk.limit)]
+
+    snapshots = []
+    for count, game_id in enumerate(game_ids, 1):
+        if bulk.action == "terminate":
+            terminate_defense_game(game_id)
+        elif bulk.action == "evict":
+            evict_defense_game(game_id)
+        else:
+            snapshots.append(snapshot_defense(defense_games[game_id]))
+            if bulk.action == "migrate":
+                # Out of service here before the copy leaves, so no attack lands on a stale game
+                evict_defense_game(game_id, outcome=None)
+        if count % 500 == 0:
+            await asyncio.sleep(0)  # let attacks through during large batches
+
+    if bulk.action == "export":
+        return {"action": "export", "count": len(snapshots), "games": snapshots}
+    if bulk.action == "migrate":
+        try:
+            await asyncio.to_thread(post_games, bulk.target, snapshots)
+        except Exception as e:
+            for snapshot in snapshots:
+                register_defense_game(snapshot["game_id"], restore_defense(snapshot))
+                if checkpointer is not None:
+                    # evict_defense_game scheduled the checkpoint for deletion
+                    checkpointer.mark("defense", snapshot["game_id"])
+            raise HTTPException(status_code=502, detail=f"Migration failed, games kept here: {e}")
+        return {"action": "migrate", "count": len(game_ids), "target": bulk.target, "game_ids": game_ids}
+    return {"action": bulk.action, "count": len(game_ids), "game_ids": game_ids}
+
+@app.post("/api/admin/games/import")
+async def import_games(snapshots: List[DefenseSnapshot]):
+    """Register games exported or migrated from another server"""
+    for count, snapshot in enumerate(snapshots, 1):
+        fsm = restore_defense(snapshot.model_dump())
+        register_defense_game(fsm.game_id, fsm)
+        if checkpointer is not None:
+            checkpointer.mark("defense", fsm.game_id)
+        if count % 500 == 0:
+            await asyncio.sleep(0)
+    return {"imported": len(snapshots)}
+
 @app.get("/api/debug/defense_games")
 async def debug_defense_games():
     #return list(defense_games.keys()) esto se quita y se cambia por:
@@ -296,20 +852,41 @@ async def debug_defense_games():
         "defense_games": list(defense_games.keys()),
         "attack_games": list(attack_games.keys())
     }
+
+@app.get("/api/debug/rejections")
+async def debug_rejections():
+    """Counters for attacks rejected by the rate limiter or turn order"""
+    return rejected_requests
     
 
 # WebSocket for real-time updates
+def defense_status_text(game_id: str) -> Optional[str]:
+    """Shared status payload for the spectators of a game"""
+    if game_id not in defense_games:
+        entry = remote_status(game_id)
+        # Same str object while the record is unchanged, the hub compares by identity
+        return entry[2] if entry is not None else None
+    return defense_status_cache.get_text(game_id, defense_games[game_id], build_defense_status)
+
+spectators = BroadcastHub(defense_status_text, interval=1.0)
+
 @app.websocket("/ws/{game_id}")
 async def websocket_endpoint(websocket: WebSocket, game_id: str):
     await websocket.accept()
+    subscriber = spectators.subscribe(game_id, websocket)
     try:
+        # Updates are pushed by the hub, this only waits for the client to leave
         while True:
-            if game_id in defense_games:
-                status = await get_defense_status(game_id)
-                await websocket.send_text(json.dumps(status.model_dump())) #aqui quite status.dict por status.model_dump
-            await asyncio.sleep(1)
+            await websocket.receive_text()
     except WebSocketDisconnect:
         pass
+    finally:
+        spectators.unsubscribe(game_id, subscriber)
+
+@app.get("/api/debug/spectators")
+async def debug_spectators():
+    """Viewers connected to each game"""
+    return spectators.stats()
 
 @app.get("/")
 async def root():
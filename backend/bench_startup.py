@@ -0,0 +1,43 @@
+"""Measure the cold start (import time) of the API server
+
+Usage: python bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+
+def import_times(module: str = "api_server"):
+    """Import module in a fresh interpreter and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [import_times() for _ in range(runs)]
+    totals = [s["api_server"] for s in samples]
+
+    print(f"api_server cold import ({runs} runs): median {statistics.median(totals) / 1000:.1f} ms, "
+          f"min {min(totals) / 1000:.1f} ms")
+
+    # Heaviest top-level dependencies of the last run
+    print("Top imports:")
+    last = samples[-1]
+    for name, us in sorted(last.items(), key=lambda item: item[1], reverse=True)[1:11]:
+        print(f"  {name:<40} {us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
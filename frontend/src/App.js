@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Ship, Target, Waves, Zap, Shield, Crosshair } from 'lucide-react';
 
 const NavalBattleGame = () => {
@@ -22,6 +22,10 @@ const NavalBattleGame = () => {
   const [enemyPort, setEnemyPort] = useState(8000);
   const [selectedAttackPosition, setSelectedAttackPosition] = useState('');
 
+  // Last status version received, polling only asks for what changed since then
+  const defenseVersion = useRef(null);
+  const attackVersion = useRef(null);
+
   const GRID_ROWS = ['A', 'B', 'C', 'D', 'E'];
   const GRID_COLS = ['1', '2', '3', '4', '5'];
 
@@ -53,10 +57,31 @@ const NavalBattleGame = () => {
     }
   };
 
+  // Merge a /status/delta response into the current status
+  const applyStatusDelta = (prev, data) => {
+    if (data.full) return data.status;
+    if (!prev) return prev;
+    const { grid, ...rest } = data.changes;
+    const unchanged = Object.keys(grid).length === 0 && Object.keys(rest).every((key) => prev[key] === rest[key]);
+    if (unchanged) return prev;
+    return { ...prev, ...rest, grid: { ...prev.grid, ...grid } };
+  };
+
+  const statusQuery = (version) => (version.current ? `&since=${version.current}` : '');
+
+  // Tokens are "<epoch>:<version>": responses can arrive out of order, so within an epoch only a newer version is applied
+  const isNewerVersion = (token, current) => {
+    if (!current) return true;
+    const [epoch, version] = token.split(':');
+    const [currentEpoch, currentVersion] = current.split(':');
+    return epoch !== currentEpoch || Number(version) > Number(currentVersion);
+  };
+
   // Defense functions
   const setupDefenseFleet = async () => {
     try {
-      await apiCall('/api/defense/setup', 'POST', { ...fleetSetup, game_id: gameId });
+      await apiCall(`/api/defense/setup?game_id=${gameId}`, 'POST', { ...fleetSetup, game_id: gameId });
+      defenseVersion.current = null;
       fetchDefenseStatus();
     } catch (error) {
       alert('Error setting up fleet: ' + error.message);
@@ -65,8 +90,10 @@ const NavalBattleGame = () => {
 
   const fetchDefenseStatus = async () => {
     try {
-      const status = await apiCall(`/api/defense/status?game_id=${gameId}`);
-      setDefenseStatus(status);
+      const data = await apiCall(`/api/defense/status/delta?game_id=${gameId}${statusQuery(defenseVersion)}`);
+      if (!isNewerVersion(data.version, defenseVersion.current)) return;
+      defenseVersion.current = data.version;
+      setDefenseStatus(prev => applyStatusDelta(prev, data));
     } catch (error) {
       console.error('Error fetching defense status:', error);
     }
@@ -75,7 +102,8 @@ const NavalBattleGame = () => {
   // Attack functions
   const initAttackGame = async () => {
     try {
-      await apiCall('/api/attack/init', 'POST', { game_id: gameId });
+      await apiCall(`/api/attack/init?game_id=${gameId}`, 'POST', { game_id: gameId });
+      attackVersion.current = null;
       fetchAttackStatus();
     } catch (error) {
       alert('Error initializing attack: ' + error.message);
@@ -85,7 +113,7 @@ const NavalBattleGame = () => {
   const sendAttack = async (position) => {
     try {
       /**PRIMERA CORRECCION*/
-      const result = await apiCall('/api/attack/send', 'POST', {
+      const result = await apiCall(`/api/attack/send?game_id=${gameId}`, 'POST', {
         position,
         enemy_host: enemyHost,
         enemy_port: parseInt(enemyPort),
@@ -102,8 +130,10 @@ const NavalBattleGame = () => {
 
   const fetchAttackStatus = async () => {
     try {
-      const status = await apiCall(`/api/attack/status?game_id=${gameId}`);
-      setAttackStatus(status);
+      const data = await apiCall(`/api/attack/status/delta?game_id=${gameId}${statusQuery(attackVersion)}`);
+      if (!isNewerVersion(data.version, attackVersion.current)) return;
+      attackVersion.current = data.version;
+      setAttackStatus(prev => applyStatusDelta(prev, data));
     } catch (error) {
       console.error('Error fetching attack status:', error);
     }